@@ -7,14 +7,14 @@ from typing import Union
 
 
 # 基本的な式の型
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Id:
     """識別子."""
 
     name: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Val:
     """整数値."""
 
@@ -25,7 +25,7 @@ class Val:
 Expr = Union["Id", "Val", "UnaryOp", "BinOp", "Call"]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class UnaryOp:
     """単項演算（マイナスなど）."""
 
@@ -33,7 +33,7 @@ class UnaryOp:
     operand: Expr
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class BinOp:
     """二項演算（比較演算子など）."""
 
@@ -42,22 +42,22 @@ class BinOp:
     right: Expr
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Call:
     """関数呼び出し."""
 
-    args: list[Expr]
+    args: tuple[Expr, ...]
 
 
 # 文の型
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class User:
     """ユーザー定義の文."""
 
     expr: Call
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Guard:
     """条件付き実行（if文）."""
 
@@ -68,7 +68,7 @@ class Guard:
 Body = Union["User", "ForLoop", "Block", "Guard"]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ForLoop:
     """forループ."""
 
@@ -79,7 +79,7 @@ class ForLoop:
     body: Body
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Block:
     """複数の文のシーケンス（ForLoop, User, または入れ子のBlockを含む）."""
 
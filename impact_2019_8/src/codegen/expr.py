@@ -2,7 +2,11 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable
+from typing import Any
+
 from ast_types import BinOp, Call, Expr, Id, UnaryOp, Val
+from ir_memo import identity_cache
 
 OP_MAP = {
     "add": "+",
@@ -21,44 +25,77 @@ UNARY_OP_MAP = {
 }
 
 
-def generate_expr(expr: Expr) -> str:
-    """式をC言語の式に変換する."""
-    if isinstance(expr, Id):
-        return expr.name
-    elif isinstance(expr, Val):
-        return str(expr.value)
-    elif isinstance(expr, UnaryOp):
-        operand = generate_expr(expr.operand)
-        op = UNARY_OP_MAP.get(expr.op, expr.op)
-        return f"({op}{operand})"
-    elif isinstance(expr, BinOp):
-        left = generate_expr(expr.left)
-        right = generate_expr(expr.right)
-        if expr.op == "max":
-            return f"max({left}, {right})"
-        elif expr.op == "min":
-            return f"min({left}, {right})"
-        op = OP_MAP.get(expr.op, expr.op)
-        return f"({left} {op} {right})"
-    elif isinstance(expr, Call):
-        return _generate_call_as_sum(expr)
-    else:
-        raise ValueError(f"Unknown expression type: {type(expr)}")
+def _c_operator(op: str) -> str:
+    """ISLの演算子名をCの演算子に変換する（未対応の演算子はここで弾く）."""
+    try:
+        return OP_MAP[op]
+    except KeyError:
+        raise ValueError(f"Unsupported operator: {op}") from None
+
+
+def _generate_id(expr: Id) -> str:
+    return expr.name
+
+
+def _generate_val(expr: Val) -> str:
+    return str(expr.value)
+
+
+def _generate_unary_op(expr: UnaryOp) -> str:
+    operand = _generate_expr(expr.operand)
+    op = UNARY_OP_MAP.get(expr.op, expr.op)
+    return f"({op}{operand})"
+
+
+def _generate_bin_op(expr: BinOp) -> str:
+    left = _generate_expr(expr.left)
+    right = _generate_expr(expr.right)
+    if expr.op == "max":
+        return f"max({left}, {right})"
+    elif expr.op == "min":
+        return f"min({left}, {right})"
+    return f"({left} {_c_operator(expr.op)} {right})"
 
 
 def _generate_call_as_sum(call: Call) -> str:
     """Call（S関数）を足し算として生成する."""
     if not call.args:
         return "0"
-    args_str = [generate_expr(arg) for arg in call.args]
+    args_str = [_generate_expr(arg) for arg in call.args]
     return " + ".join(args_str)
 
 
+# isinstanceの連鎖を避け、ノードの型から直接ハンドラを引く
+_EXPR_HANDLERS: dict[type, Callable[[Any], str]] = {
+    Id: _generate_id,
+    Val: _generate_val,
+    UnaryOp: _generate_unary_op,
+    BinOp: _generate_bin_op,
+    Call: _generate_call_as_sum,
+}
+
+
+def _generate_expr(expr: Expr) -> str:
+    handler = _EXPR_HANDLERS.get(type(expr))
+    if handler is None:
+        raise ValueError(f"Unknown expression type: {type(expr)}")
+    return handler(expr)
+
+
+# 同一ノード(ループ境界など)の文字列化結果を再利用する。再帰の内側では
+# キャッシュを引かず、キーもノードの同一性なので部分木のハッシュは発生しない
+@identity_cache(maxsize=4096)
+def generate_expr(expr: Expr) -> str:
+    """式をC言語の式に変換する."""
+    return _generate_expr(expr)
+
+
+@identity_cache(maxsize=4096)
 def generate_cond(cond: BinOp) -> str:
     """条件式を生成する."""
-    op = OP_MAP.get(cond.op, cond.op)
-    left = generate_expr(cond.left)
-    right = generate_expr(cond.right)
+    op = _c_operator(cond.op)
+    left = _generate_expr(cond.left)
+    right = _generate_expr(cond.right)
     return f"{left} {op} {right}"
 
 
@@ -2,14 +2,23 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable
+from typing import Any
+
 from ast_types import Block, Body, Call, ForLoop, Guard, Id, User, Val
 from ir_types import Compute, PrimFunc
 
 from .expr import generate_cond, generate_expr
-from .ops import generate_user_stmt
+from .ops import ComputeInfo, analyze_compute, generate_user_stmt
 
 AstInput = ForLoop | Block
 
+# ISLが生成するループ条件の比較演算子
+_LOOP_COND_OPS = {"le": "<=", "lt": "<"}
+
+# 深さごとのインデント文字列（必要に応じて伸長する）
+_INDENT_CACHE: list[str] = [""]
+
 
 class CCodeGenerator:
     """ForLoopからC言語コードを生成するクラス."""
@@ -19,101 +28,124 @@ class CCodeGenerator:
         self._indent_level = 0
         # Compute名からComputeへのマッピングを作成
         self._computes: dict[str, Compute] = {c.name: c for c in func.computes}
+        # 文の生成ごとに不変なComputeの情報を事前に抽出しておく
+        self._compute_infos: dict[str, ComputeInfo] = {
+            c.name: analyze_compute(c) for c in func.computes
+        }
+        # 同一のUser呼び出しに対して生成した文（インデント前の行）を再利用する
+        self._stmt_cache: dict[Call, tuple[str, ...]] = {}
+        # 文の型からハンドラへのディスパッチテーブル
+        self._body_handlers: dict[type, Callable[[Any, list[str]], None]] = {
+            User: self._generate_user,
+            ForLoop: self._generate_for_loop,
+            Block: self._generate_block,
+            Guard: self._generate_guard,
+        }
 
     def generate(self, ast: AstInput) -> str:
         """ForLoopまたはBlockからC言語コードを生成する."""
         args = [tensor.name for tensor in self._func.params]
         args_str = ", ".join(f"int *{name}" for name in args) if args else "void"
-        lines = [
-            f"void {self._func.name}({args_str}) {{",
-        ]
+        # 全ての行をこのバッファに追記し、最後に一度だけ結合する
+        out = [f"void {self._func.name}({args_str}) {{"]
         self._indent_level = 1
         if isinstance(ast, Block):
-            lines.append(self._generate_block(ast))
+            self._generate_block(ast, out)
         else:
-            lines.append(self._generate_for_loop(ast))
-        lines.append("}")
-        return "\n".join(lines)
+            self._generate_for_loop(ast, out)
+        out.append("}")
+        return "\n".join(out)
 
-    def _generate_block(self, block: Block) -> str:
+    def _generate_block(self, block: Block, out: list[str]) -> None:
         """Blockを複数の文に変換する（ForLoop, User, または入れ子Block）."""
-        stmt_strs = [self._generate_body(stmt) for stmt in block.stmts]
-        return "\n".join(s for s in stmt_strs if s)
+        for stmt in block.stmts:
+            self._generate_body(stmt, out)
 
     def _indent(self) -> str:
         """現在のインデントを返す."""
-        return "    " * self._indent_level
+        level = self._indent_level
+        while len(_INDENT_CACHE) <= level:
+            _INDENT_CACHE.append("    " * len(_INDENT_CACHE))
+        return _INDENT_CACHE[level]
 
-    def _generate_for_loop(self, loop: ForLoop) -> str:
+    def _generate_for_loop(self, loop: ForLoop, out: list[str]) -> None:
         """ForLoopをC言語のforループに変換する."""
         iterator = loop.iterator.name
-        init_str = generate_expr(loop.init)
-        cond_str = generate_cond(loop.cond)
-        inc_expr = loop.inc
-
-        lines = []
         indent = self._indent()
+        cond = loop.cond
+        inc_expr = loop.inc
 
-        if isinstance(inc_expr, Val) and inc_expr.value == 1:
-            inc_str = f"{iterator}++"
+        # 最も多い `it <op> bound; it++` の形はヘッダを直接組み立てる
+        if (
+            isinstance(inc_expr, Val)
+            and inc_expr.value == 1
+            and cond.op in _LOOP_COND_OPS
+            and cond.left == loop.iterator
+        ):
+            init_str = generate_expr(loop.init)
+            bound_str = generate_expr(cond.right)
+            out.append(
+                f"{indent}for (int {iterator} = {init_str}; "
+                f"{iterator} {_LOOP_COND_OPS[cond.op]} {bound_str}; {iterator}++) {{"
+            )
         else:
-            inc_str = f"{iterator} += {generate_expr(inc_expr)}"
-
-        lines.append(
-            f"{indent}for (int {iterator} = {init_str}; {cond_str}; {inc_str}) {{"
-        )
+            init_str = generate_expr(loop.init)
+            cond_str = generate_cond(cond)
+            if isinstance(inc_expr, Val) and inc_expr.value == 1:
+                inc_str = f"{iterator}++"
+            else:
+                inc_str = f"{iterator} += {generate_expr(inc_expr)}"
+            out.append(
+                f"{indent}for (int {iterator} = {init_str}; {cond_str}; {inc_str}) {{"
+            )
 
         self._indent_level += 1
-        body_str = self._generate_body(loop.body)
-        if body_str:
-            lines.append(body_str)
+        self._generate_body(loop.body, out)
         self._indent_level -= 1
 
-        lines.append(f"{indent}}}")
-        return "\n".join(lines)
+        out.append(f"{indent}}}")
 
-    def _generate_body(self, body: Body) -> str:
+    def _generate_body(self, body: Body, out: list[str]) -> None:
         """bodyを生成する."""
-        if isinstance(body, User):
-            indent = self._indent()
-            # Call argsの最初の要素がCompute名
-            call = body.expr
-            if not isinstance(call, Call) or not call.args:
-                raise ValueError("User body must contain a Call with args")
-            first_arg = call.args[0]
-            if not isinstance(first_arg, Id):
-                raise ValueError("First arg of Call must be an Id (compute name)")
-            compute_name = first_arg.name
-            compute = self._computes.get(compute_name)
-            if compute is None:
-                raise ValueError(f"Unknown compute: {compute_name}")
-            stmt = generate_user_stmt(call, compute)
-            if not stmt:
-                return ""
-            lines = stmt.splitlines()
-            return "\n".join(f"{indent}{line}" for line in lines)
-        elif isinstance(body, ForLoop):
-            return self._generate_for_loop(body)
-        elif isinstance(body, Block):
-            return self._generate_block(body)
-        elif isinstance(body, Guard):
-            return self._generate_guard(body)
-        else:
+        handler = self._body_handlers.get(type(body))
+        if handler is None:
             raise ValueError(f"Unknown body type: {type(body)}")
+        handler(body, out)
 
-    def _generate_guard(self, guard: Guard) -> str:
+    def _generate_user(self, user: User, out: list[str]) -> None:
+        """User文をComputeの代入文に変換する."""
+        indent = self._indent()
+        call = user.expr
+        lines = self._stmt_cache.get(call)
+        if lines is None:
+            lines = tuple(self._render_user_stmt(call).splitlines())
+            self._stmt_cache[call] = lines
+        out.extend(f"{indent}{line}" for line in lines)
+
+    def _render_user_stmt(self, call: Call) -> str:
+        """User文のCallから対応するComputeの代入文を生成する."""
+        # Call argsの最初の要素がCompute名
+        if not isinstance(call, Call) or not call.args:
+            raise ValueError("User body must contain a Call with args")
+        first_arg = call.args[0]
+        if not isinstance(first_arg, Id):
+            raise ValueError("First arg of Call must be an Id (compute name)")
+        compute_name = first_arg.name
+        compute = self._computes.get(compute_name)
+        if compute is None:
+            raise ValueError(f"Unknown compute: {compute_name}")
+        return generate_user_stmt(call, compute, self._compute_infos[compute_name])
+
+    def _generate_guard(self, guard: Guard, out: list[str]) -> None:
         """Guard（条件付き実行）をif文に変換する."""
         indent = self._indent()
         cond_str = generate_cond(guard.cond)
 
-        lines = [f"{indent}if ({cond_str}) {{"]
+        out.append(f"{indent}if ({cond_str}) {{")
         self._indent_level += 1
-        body_str = self._generate_body(guard.then)
-        if body_str:
-            lines.append(body_str)
+        self._generate_body(guard.then, out)
         self._indent_level -= 1
-        lines.append(f"{indent}}}")
-        return "\n".join(lines)
+        out.append(f"{indent}}}")
 
 
 def isl_ast_to_c(ast: AstInput, func: PrimFunc) -> str:
@@ -2,36 +2,42 @@
 
 from __future__ import annotations
 
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import lru_cache
+from operator import itemgetter
+
 from ast_types import Call
+from ir_memo import identity_cache
 from ir_types import (
     Access,
     BinaryOp,
     BinOpKind,
+    Compare,
     Compute,
+    Constraint,
     Expr,
     FloatConst,
     IntConst,
     Load,
+    Logical,
     ReduceStore,
     Store,
     Tensor,
+    UnaryOp,
     Var,
 )
+from ir_types import Call as IRCall
 
 from .expr import generate_index_expr
 
-_BIN_OP_SYMBOL: dict[BinOpKind, str] = {
-    "Add": "+",
-    "Sub": "-",
-    "Mul": "*",
-    "Div": "/",
-}
-
-_BIN_OP_PRECEDENCE: dict[BinOpKind, int] = {
-    "Add": 1,
-    "Sub": 1,
-    "Mul": 2,
-    "Div": 2,
+# 演算子ごとの (C言語の記号, 優先順位)
+_BIN_OP_INFO: dict[BinOpKind, tuple[str, int]] = {
+    "Add": ("+", 1),
+    "Sub": ("-", 1),
+    "Mul": ("*", 2),
+    "Div": ("/", 2),
 }
 
 _UPDATE_OP: dict[str, str] = {
@@ -40,70 +46,142 @@ _UPDATE_OP: dict[str, str] = {
 }
 
 
-def _wrap_if_needed(expr: str) -> str:
-    """式が演算子を含む場合、括弧で囲む."""
-    # 空白を含む場合は演算子がある可能性が高い
-    if " " in expr:
-        return f"({expr})"
-    return expr
+# インデックス文字列と、ストライド計算に埋め込む際に括弧が必要かどうかの組
+IndexStr = tuple[str, bool]
+
+
+@identity_cache(maxsize=1024)
+def _tensor_extents(tensor: Tensor) -> tuple[str, ...]:
+    """テンソル各次元のextentを文字列化する（形状は静的なので一度だけ行う）."""
+    extents = []
+    for extent in tensor.shape:
+        # extentがExprの場合は文字列化
+        if isinstance(extent, Var):
+            extents.append(extent.name)
+        elif isinstance(extent, IntConst):
+            extents.append(str(extent.value))
+        else:
+            extents.append(str(extent))
+    return tuple(extents)
+
+
+def _linearize(values: tuple[str, ...], extents: tuple[str, ...]) -> str:
+    """行優先のオフセット `((i*M + j)*K + k)` を組み立てる.
 
+    extentが1の次元の乗算と、インデックスが0の次元の加算は省略する。
+    """
+    offset = values[0]
+    for extent, value in zip(extents[1:], values[1:], strict=True):
+        if offset == "0":
+            offset = value
+            continue
+        scaled = offset if extent == "1" else f"{offset}*{extent}"
+        offset = scaled if value == "0" else f"({scaled} + {value})"
+    return offset
 
-def _format_tensor_access(tensor: Tensor, indices: list[str]) -> str:
-    if len(indices) != len(tensor.shape):
+
+def _format_tensor_access(tensor: Tensor, indices: list[IndexStr]) -> str:
+    rank = len(tensor.shape)
+    if len(indices) != rank:
         raise ValueError(
             f"Index rank mismatch for {tensor.name}: "
-            f"got {len(indices)} indices, expected {len(tensor.shape)}"
+            f"got {len(indices)} indices, expected {rank}"
         )
 
-    if not indices:
-        return tensor.name
-    if len(indices) == 1:
-        return f"{tensor.name}[{indices[0]}]"
+    if rank == 0:
+        # スカラーもポインタで渡されるので、唯一の要素を参照する
+        return f"{tensor.name}[0]"
+    if rank == 1:
+        return f"{tensor.name}[{indices[0][0]}]"
 
-    # 最初のインデックスが複雑な式の場合は括弧で囲む
-    offset = _wrap_if_needed(indices[0])
-    for dim in range(1, len(indices)):
-        extent = tensor.shape[dim]
-        # extentがExprの場合は文字列化
-        if isinstance(extent, Var):
-            extent_str = extent.name
-        elif isinstance(extent, IntConst):
-            extent_str = str(extent.value)
-        else:
-            extent_str = str(extent)
-        offset = f"({offset}*{extent_str} + {_wrap_if_needed(indices[dim])})"
-    return f"{tensor.name}[{offset}]"
+    # 演算子を含むインデックスのみ括弧で囲む
+    values = tuple(
+        f"({index})" if needs_parens else index for index, needs_parens in indices
+    )
+    return f"{tensor.name}[{_linearize(values, _tensor_extents(tensor))}]"
 
 
-def _resolve_indices(access: Access, axis_to_var: dict[str, str]) -> list[str]:
-    result = []
+def _resolve_indices(access: Access, axis_to_var: dict[str, str]) -> list[IndexStr]:
+    # axis_to_varの値はISL AST由来の式で、原子式・括弧付き二項演算・関数呼び出し
+    # のいずれかなので、そのまま埋め込める
+    result: list[IndexStr] = []
     for idx_expr in access.index:
         if isinstance(idx_expr, Var):
-            result.append(axis_to_var.get(idx_expr.name, idx_expr.name))
+            result.append((axis_to_var.get(idx_expr.name, idx_expr.name), False))
         elif isinstance(idx_expr, IntConst):
-            result.append(str(idx_expr.value))
+            result.append((str(idx_expr.value), False))
         else:
             # 複雑な式の場合は再帰的に処理
-            result.append(_generate_ir_expr(idx_expr, axis_to_var))
+            rendered = _generate_ir_expr(idx_expr, axis_to_var)
+            result.append((rendered, isinstance(idx_expr, BinaryOp)))
     return result
 
 
-def _needs_parens(
-    parent_op: BinOpKind, child_op: BinOpKind, child_is_right: bool
-) -> bool:
-    parent_prec = _BIN_OP_PRECEDENCE.get(parent_op, 0)
-    child_prec = _BIN_OP_PRECEDENCE.get(child_op, 0)
+def _generate_const(
+    expr: IntConst | FloatConst,
+    axis_to_var: dict[str, str],
+    parent_op: BinOpKind | None,
+    child_is_right: bool,
+) -> str:
+    return str(expr.value)
+
+
+def _generate_var(
+    expr: Var,
+    axis_to_var: dict[str, str],
+    parent_op: BinOpKind | None,
+    child_is_right: bool,
+) -> str:
+    return axis_to_var.get(expr.name, expr.name)
+
 
-    if child_prec < parent_prec:
-        return True
-    if child_prec > parent_prec:
-        return False
-    if not child_is_right:
-        return False
+def _generate_load(
+    expr: Load,
+    axis_to_var: dict[str, str],
+    parent_op: BinOpKind | None,
+    child_is_right: bool,
+) -> str:
+    indices = _resolve_indices(expr.access, axis_to_var)
+    return _format_tensor_access(expr.access.tensor, indices)
 
-    if parent_op in ("Sub", "Div"):
-        return True
-    return bool(parent_op == "Mul" and child_op == "Div")
+
+def _generate_binary_op(
+    expr: BinaryOp,
+    axis_to_var: dict[str, str],
+    parent_op: BinOpKind | None,
+    child_is_right: bool,
+    # 再帰の度に参照するテーブルはデフォルト引数でローカルに束縛する
+    _op_info: dict[BinOpKind, tuple[str, int]] = _BIN_OP_INFO,
+) -> str:
+    op = expr.op
+    try:
+        symbol, child_prec = _op_info[op]
+    except KeyError:
+        raise ValueError(f"Unsupported binary op: {op}") from None
+    left = _generate_ir_expr(expr.lhs, axis_to_var, op, False)
+    right = _generate_ir_expr(expr.rhs, axis_to_var, op, True)
+    rendered = f"{left} {symbol} {right}"
+    if parent_op is None:
+        return rendered
+
+    # 親より優先順位が低い場合、または同順位で非結合的な演算の右辺の場合に括弧が必要
+    parent_prec = _op_info[parent_op][1]
+    if child_prec < parent_prec or (
+        child_prec == parent_prec
+        and child_is_right
+        and (parent_op in ("Sub", "Div") or (parent_op == "Mul" and op == "Div"))
+    ):
+        return f"({rendered})"
+    return rendered
+
+
+_IR_EXPR_HANDLERS: dict[type, Callable[..., str]] = {
+    IntConst: _generate_const,
+    FloatConst: _generate_const,
+    Var: _generate_var,
+    Load: _generate_load,
+    BinaryOp: _generate_binary_op,
+}
 
 
 def _generate_ir_expr(
@@ -112,64 +190,132 @@ def _generate_ir_expr(
     parent_op: BinOpKind | None = None,
     child_is_right: bool = False,
 ) -> str:
-    if isinstance(expr, IntConst):
-        return str(expr.value)
-    if isinstance(expr, FloatConst):
-        return str(expr.value)
-    if isinstance(expr, Var):
-        return axis_to_var.get(expr.name, expr.name)
-    if isinstance(expr, Load):
-        indices = _resolve_indices(expr.access, axis_to_var)
-        return _format_tensor_access(expr.access.tensor, indices)
-    if isinstance(expr, BinaryOp):
-        left = _generate_ir_expr(expr.lhs, axis_to_var, expr.op, False)
-        right = _generate_ir_expr(expr.rhs, axis_to_var, expr.op, True)
-        symbol = _BIN_OP_SYMBOL.get(expr.op, expr.op)
-        rendered = f"{left} {symbol} {right}"
-        if parent_op is not None and _needs_parens(parent_op, expr.op, child_is_right):
-            return f"({rendered})"
-        return rendered
+    handler = _IR_EXPR_HANDLERS.get(type(expr))
+    if handler is None:
+        raise ValueError(f"Unknown Expr type: {type(expr)}")
+    return handler(expr, axis_to_var, parent_op, child_is_right)
+
+
+def _flatten_and(constraint: Constraint) -> list[Constraint]:
+    """`a and (b and c)` を [a, b, c] に展開する."""
+    result: list[Constraint] = []
+    stack = [constraint]
+    while stack:
+        c = stack.pop()
+        if isinstance(c, Logical) and c.op == "And":
+            stack += (c.rhs, c.lhs)
+        else:
+            result.append(c)
+    return result
+
 
-    raise ValueError(f"Unknown Expr type: {type(expr)}")
+def _mentions_var(node: Expr | Constraint, name: str) -> bool:
+    """式・制約に変数nameが現れるかを調べる."""
+    stack: list[Expr | Constraint] = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, Var):
+            if n.name == name:
+                return True
+        elif isinstance(n, (BinaryOp, Compare, Logical)):
+            stack += (n.lhs, n.rhs)
+        elif isinstance(n, UnaryOp):
+            stack.append(n.operand)
+        elif isinstance(n, IRCall):
+            stack.extend(n.args)
+        elif isinstance(n, Load):
+            stack.extend(n.access.index)
+    return False
+
+
+# `bound op k` / `k op bound` の形の制約で、boundが下限になる演算子と
+# 狭義の不等号かどうか
+_LOWER_BOUND_IF_LHS: dict[str, bool] = {"LE": False, "LT": True, "EQ": False}
+_LOWER_BOUND_IF_RHS: dict[str, bool] = {"GE": False, "GT": True, "EQ": False}
+_UPPER_BOUND_OPS = frozenset({"LE", "LT", "GE", "GT"})
+
+
+def _lower_bound_error(compute: Compute, name: str, reason: str) -> ValueError:
+    return ValueError(
+        f"Cannot derive the lower bound of reduction iterator '{name}' "
+        f"in {compute.name}: {reason}"
+    )
+
+
+def _reduction_lower_bound(
+    compute: Compute, name: str, axis_to_var: dict[str, str]
+) -> str:
+    """ドメイン制約からイテレータの下限を求める.
+
+    `lo <= k` / `lo < k` / `k >= lo` / `k > lo` / `k == lo` の形の制約の lo
+    (kを含まない式) を下限の候補とし、候補が複数あればその最大値を下限とする。
+    定数の候補はまとめて1つにし、それ以外は `max(a, b)` で組み合わせる。
+    kを含むそれ以外の形の制約があると下限を正しく求められないのでエラーにする。
+    """
+    const_bound: int | None = None
+    symbolic: list[str] = []
+    for constraint in compute.domain.constraints:
+        for c in _flatten_and(constraint):
+            if not _mentions_var(c, name):
+                continue
+            if not isinstance(c, Compare):
+                raise _lower_bound_error(compute, name, "non-conjunctive constraint")
+            if isinstance(c.rhs, Var) and c.rhs.name == name:
+                bound, lower_ops = c.lhs, _LOWER_BOUND_IF_LHS
+            elif isinstance(c.lhs, Var) and c.lhs.name == name:
+                bound, lower_ops = c.rhs, _LOWER_BOUND_IF_RHS
+            else:
+                raise _lower_bound_error(compute, name, "unsupported constraint form")
+            if _mentions_var(bound, name):
+                raise _lower_bound_error(compute, name, "unsupported constraint form")
+
+            strict = lower_ops.get(c.op)
+            if strict is None:
+                if c.op in _UPPER_BOUND_OPS:
+                    continue
+                raise _lower_bound_error(compute, name, f"unsupported op {c.op}")
+            if isinstance(bound, IntConst):
+                value = bound.value + 1 if strict else bound.value
+                const_bound = value if const_bound is None else max(const_bound, value)
+                continue
+            if strict:
+                bound = BinaryOp("Add", bound, IntConst(1))
+            rendered = _generate_ir_expr(bound, axis_to_var)
+            if rendered not in symbolic:
+                symbolic.append(rendered)
+
+    candidates = symbolic if const_bound is None else [str(const_bound), *symbolic]
+    if not candidates:
+        raise _lower_bound_error(compute, name, "no lower bound in the domain")
+    lower = candidates[0]
+    for candidate in candidates[1:]:
+        lower = f"max({lower}, {candidate})"
+    return lower
 
 
 def _generate_reduction_init_cond(
     compute: Compute,
-    target_access: Access,
+    reduce_iter_names: tuple[str, ...],
     axis_to_var: dict[str, str],
 ) -> str:
-    # ターゲットのインデックスに含まれる変数名を取得
-    target_vars = set()
-    for idx_expr in target_access.index:
-        if isinstance(idx_expr, Var):
-            target_vars.add(idx_expr.name)
-
-    # reduce軸を探す
-    reduce_axes = [it for it in compute.domain.iterators if it.kind == "reduce"]
-    if not reduce_axes:
-        reduce_axes = [
-            it for it in compute.domain.iterators if it.name not in target_vars
-        ]
-    if not reduce_axes:
+    if not reduce_iter_names:
         return "1"
 
     parts = []
-    for it in reduce_axes:
-        var = axis_to_var.get(it.name)
+    for name in reduce_iter_names:
+        var = axis_to_var.get(name)
         if var is None:
-            raise ValueError(f"Missing loop variable for iterator '{it.name}'")
-        # 初期値は0を仮定（制約から取得するのが本来の実装）
-        parts.append(f"{var} == 0")
+            raise ValueError(f"Missing loop variable for iterator '{name}'")
+        lower = _reduction_lower_bound(compute, name, axis_to_var)
+        parts.append(f"{var} == {lower}")
     return " && ".join(parts)
 
 
-def generate_user_stmt(call: Call, compute: Compute) -> str:
-    num_indices = len(compute.domain.iterators)
-    index_exprs = call.args[-num_indices:] if call.args and num_indices > 0 else []
-    indices = [generate_index_expr(arg) for arg in index_exprs]
-
-    axis_to_var = {it.name: indices[i] for i, it in enumerate(compute.domain.iterators)}
-
+def _render_stmt(
+    compute: Compute,
+    reduce_iter_names: tuple[str, ...],
+    axis_to_var: dict[str, str],
+) -> str:
     stmt = compute.body
     if isinstance(stmt, Store):
         target_ref = _format_tensor_access(
@@ -193,12 +339,15 @@ def generate_user_stmt(call: Call, compute: Compute) -> str:
         # ISLで初期化を別statementとして扱い、依存関係を定義するのが本筋
         lines: list[str] = []
         if stmt.init is not None:
-            cond = _generate_reduction_init_cond(compute, stmt.access, axis_to_var)
+            cond = _generate_reduction_init_cond(
+                compute, reduce_iter_names, axis_to_var
+            )
             init_value = _generate_ir_expr(stmt.init, axis_to_var)
             lines.append(f"if ({cond}) {target_ref} = {init_value};")
 
-        if stmt.op in _UPDATE_OP:
-            lines.append(f"{target_ref} {_UPDATE_OP[stmt.op]} {value};")
+        update_op = _UPDATE_OP.get(stmt.op)
+        if update_op is not None:
+            lines.append(f"{target_ref} {update_op} {value};")
             return "\n".join(lines)
 
         if stmt.op == "Max":
@@ -216,3 +365,96 @@ def generate_user_stmt(call: Call, compute: Compute) -> str:
         raise ValueError(f"Unsupported reduce op: {stmt.op}")
 
     raise ValueError(f"Unknown Stmt type: {type(stmt)}")
+
+
+_SENTINEL_RE = re.compile("\x00([^\x00]*)\x00")
+
+
+def _compile_stmt_template(
+    compute: Compute,
+    iter_names: tuple[str, ...],
+    reduce_iter_names: tuple[str, ...],
+) -> tuple[str, tuple[int, ...]]:
+    """ループ変数の部分だけを `%s` で残した代入文のテンプレートを作る.
+
+    ループ変数の位置に番兵文字列を置いて一度だけ文を生成し、
+    それを位置指定の%書式のプレースホルダに置き換える。
+    各プレースホルダに入るイテレータの位置を出現順に合わせて返す。
+    """
+    sentinels = {name: f"\x00{name}\x00" for name in iter_names}
+    rendered = _render_stmt(compute, reduce_iter_names, sentinels)
+    # splitの結果は「本文, イテレータ名, 本文, ...」の交互の並びになる
+    parts = _SENTINEL_RE.split(rendered)
+    positions = {name: i for i, name in enumerate(iter_names)}
+    template = "%s".join(text.replace("%", "%%") for text in parts[::2])
+    slots = tuple(positions[name] for name in parts[1::2])
+    return template, slots
+
+
+def _no_slots(values: tuple[str, ...]) -> tuple[str, ...]:
+    return ()
+
+
+@lru_cache(maxsize=256)
+def _slot_getter(slots: tuple[int, ...]) -> Callable[[tuple[str, ...]], object]:
+    """プレースホルダの並びに合わせてインデックス文字列を取り出す関数を返す.
+
+    itemgetterは要素が1つのときタプルでなく値そのものを返すが、
+    `%` 演算子は単一の文字列もそのまま受け付けるので問題ない。
+    """
+    if not slots:
+        return _no_slots
+    return itemgetter(*slots)
+
+
+@dataclass(frozen=True, slots=True)
+class ComputeInfo:
+    """コード生成のためにComputeから事前に抽出した情報."""
+
+    # ドメインのイテレータ名（Callの末尾インデックスと同じ順序）
+    iter_names: tuple[str, ...]
+    # ループ変数を位置指定の `%s` として埋め込んだ代入文
+    template: str
+    # Callのインデックス文字列からテンプレートの引数を取り出す関数
+    getter: Callable[[tuple[str, ...]], object]
+
+
+@identity_cache(maxsize=256)
+def analyze_compute(compute: Compute) -> ComputeInfo:
+    """Computeから文の生成ごとに不変な情報を一度だけ抽出する."""
+    iterators = compute.domain.iterators
+    iter_names = tuple(it.name for it in iterators)
+
+    reduce_iter_names: tuple[str, ...] = ()
+    if isinstance(compute.body, ReduceStore):
+        reduce_iter_names = tuple(it.name for it in iterators if it.kind == "reduce")
+        if not reduce_iter_names:
+            # reduce軸が明示されていない場合は、ターゲットに現れない軸とみなす
+            target_vars = {
+                idx.name for idx in compute.body.access.index if isinstance(idx, Var)
+            }
+            reduce_iter_names = tuple(
+                name for name in iter_names if name not in target_vars
+            )
+
+    template, slots = _compile_stmt_template(compute, iter_names, reduce_iter_names)
+    return ComputeInfo(
+        iter_names=iter_names,
+        template=template,
+        getter=_slot_getter(slots),
+    )
+
+
+def generate_user_stmt(
+    call: Call, compute: Compute, info: ComputeInfo | None = None
+) -> str:
+    if info is None:
+        info = analyze_compute(compute)
+    index_exprs = call.args[1:]
+    if len(index_exprs) != len(info.iter_names):
+        raise ValueError(
+            f"Call for {compute.name} has {len(index_exprs)} indices, "
+            f"expected {len(info.iter_names)}"
+        )
+    values = tuple(map(generate_index_expr, index_exprs))
+    return info.template % info.getter(values)
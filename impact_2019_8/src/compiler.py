@@ -1,13 +1,15 @@
 from __future__ import annotations
 
-from collections.abc import Sequence
+from collections.abc import Callable, Sequence
+from typing import Any
 
 import islpy as isl
 
 from codegen import isl_ast_to_c
-from ir_to_isl import build_domain, build_schedule
+from ir_memo import structural_cache
+from ir_to_isl import build_domain, build_schedule, default_context
 from ir_types import PrimFunc
-from isl_ast import build_ast_from_domain_and_schedule
+from isl_ast import build_ast_from_domain_and_schedule, build_ast_from_schedule
 from isl_ast_converter import convert_ast_node
 from isl_fusion import build_fused_ast
 from optimization_types import Tile
@@ -20,31 +22,63 @@ def _compile_single(
     optimize: bool,
     tiles: list[Tile] | None,
 ) -> str:
-    if schedule is None:
-        if optimize:
-            schedule = compute_optimized_schedule(func)
-            if tiles:
-                schedule = apply_tiling_to_schedule(schedule, tiles)
-        else:
-            ctx = isl.Context()
-            isl_domain = build_domain(func, ctx)
-            isl_schedule = build_schedule(func, ctx)
-            ast = build_ast_from_domain_and_schedule(isl_domain, isl_schedule)
-            parsed_ast = convert_ast_node(ast)
-            return isl_ast_to_c(parsed_ast, func)
-
-    if isinstance(schedule, isl.Schedule):
-        ctx = schedule.get_ctx()
-        context_set = isl.Set("{ : }", ctx)
-        build = isl.AstBuild.from_context(context_set)
-        ast = build.node_from_schedule(schedule)
-    else:
-        ctx = schedule.get_ctx()
-        isl_domain = build_domain(func, ctx)
-        ast = build_ast_from_domain_and_schedule(isl_domain, schedule)
-
-    parsed_ast = convert_ast_node(ast)
-    return isl_ast_to_c(parsed_ast, func)
+    if schedule is not None:
+        return _compile_with_schedule(func, schedule)
+    if optimize:
+        return _compile_optimized(func, tuple(tiles) if tiles else ())
+    # タイル指定は最適化スケジュールにのみ適用されるので無視する
+    return _compile_plain(func)
+
+
+# 構造が等しいPrimFuncの再コンパイルは、ISLのスケジュール計算・AST構築を
+# 丸ごと省略できる。キーは木を平坦化したもので、PrimFuncを直接ハッシュしない
+@structural_cache(maxsize=256)
+def _compile_plain(func: PrimFunc) -> str:
+    ctx = default_context()
+    isl_domain = build_domain(func, ctx)
+    isl_schedule = build_schedule(func, ctx)
+    ast = build_ast_from_domain_and_schedule(isl_domain, isl_schedule)
+    return isl_ast_to_c(convert_ast_node(ast), func)
+
+
+@structural_cache(maxsize=256)
+def _compile_optimized(func: PrimFunc, tiles: tuple[Tile, ...]) -> str:
+    schedule = compute_optimized_schedule(func)
+    if tiles:
+        schedule = apply_tiling_to_schedule(schedule, list(tiles))
+    return _compile_with_schedule(func, schedule)
+
+
+def _compile_from_schedule_tree(func: PrimFunc, schedule: isl.Schedule) -> str:
+    ast = build_ast_from_schedule(schedule)
+    return isl_ast_to_c(convert_ast_node(ast), func)
+
+
+def _compile_from_schedule_map(func: PrimFunc, schedule: isl.UnionMap) -> str:
+    isl_domain = build_domain(func, schedule.get_ctx())
+    ast = build_ast_from_domain_and_schedule(isl_domain, schedule)
+    return isl_ast_to_c(convert_ast_node(ast), func)
+
+
+# スケジュールの種類ごとのコンパイル関数（未登録の型はスケジュールマップ扱い）
+_SCHEDULE_COMPILERS: dict[type, Callable[[PrimFunc, Any], str]] = {
+    isl.Schedule: _compile_from_schedule_tree,
+    isl.UnionMap: _compile_from_schedule_map,
+}
+
+
+def _compile_with_schedule(
+    func: PrimFunc,
+    schedule: isl.UnionMap | isl.Schedule,
+) -> str:
+    handler = _SCHEDULE_COMPILERS.get(type(schedule), _compile_from_schedule_map)
+    return handler(func, schedule)
+
+
+@structural_cache(maxsize=64)
+def _compile_fused(funcs: tuple[PrimFunc, ...]) -> str:
+    parsed_ast, fused_func = build_fused_ast(funcs)
+    return isl_ast_to_c(parsed_ast, fused_func)
 
 
 def compile(
@@ -66,5 +100,4 @@ def compile(
     if tiles:
         raise ValueError("Tiling is not supported for multiple PrimFunc")
 
-    parsed_ast, fused_func = build_fused_ast(funcs)
-    return isl_ast_to_c(parsed_ast, fused_func)
+    return _compile_fused(tuple(funcs))
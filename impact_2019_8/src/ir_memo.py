@@ -0,0 +1,144 @@
+"""IR・ASTノードを引数に取る関数のキャッシュ.
+
+frozen dataclassの __hash__ / __eq__ は部分木を再帰的にたどるため、木を
+そのまま lru_cache のキーにすると、深い式ではキーの計算だけで再帰上限に
+達し、再帰的に呼ばれる関数では呼び出しごとに部分木をハッシュし直す。
+ここではキーを浅く保つ2種類のキャッシュを提供する。
+
+- identity_cache: ノードの同一性 (id) をキーにする。一度のコンパイル中に
+  同じノードで何度も呼ばれる変換向け。
+- structural_cache: 木を平坦なタプルに展開したものをキーにする。構造が
+  等しい別オブジェクトも同じエントリに当たるので、関数単位の結果向け。
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import fields, is_dataclass
+from functools import update_wrapper
+from typing import Any, Generic, NamedTuple, TypeVar
+
+R = TypeVar("R")
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class _KeyedCache(Generic[R]):
+    """引数から作った浅いキーで結果を覚えるLRUキャッシュ"""
+
+    def __init__(
+        self,
+        func: Callable[..., R],
+        make_key: Callable[[tuple[Any, ...]], Hashable],
+        maxsize: int,
+    ) -> None:
+        self._func = func
+        self._make_key = make_key
+        self._maxsize = maxsize
+        # 値には引数も保持し、idをキーにしたエントリの対象が解放されて
+        # 別オブジェクトにidが再利用されるのを防ぐ
+        self._entries: OrderedDict[Hashable, tuple[tuple[Any, ...], R]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        update_wrapper(self, func)
+
+    def __call__(self, *args: Any) -> R:
+        key = self._make_key(args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+        # 例外はキャッシュしない
+        result = self._func(*args)
+        with self._lock:
+            self._entries[key] = (args, result)
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def cache_info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                self._hits, self._misses, self._maxsize, len(self._entries)
+            )
+
+    def cache_clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+
+
+def _identity_key(args: tuple[Any, ...]) -> Hashable:
+    return tuple(map(id, args))
+
+
+def identity_cache(
+    maxsize: int = 4096,
+) -> Callable[[Callable[..., R]], _KeyedCache[R]]:
+    """引数の同一性をキーにするキャッシュ（キー計算は木の大きさによらない）"""
+
+    def decorator(func: Callable[..., R]) -> _KeyedCache[R]:
+        return _KeyedCache(func, _identity_key, maxsize)
+
+    return decorator
+
+
+# 展開せずにそのままキーへ入れる葉の型
+_ATOM_TYPES = frozenset({str, int, float, bool, type(None)})
+
+_FIELD_NAMES: dict[type, tuple[str, ...]] = {}
+
+
+def _field_names(cls: type) -> tuple[str, ...]:
+    names = _FIELD_NAMES.get(cls)
+    if names is None:
+        if not is_dataclass(cls):
+            raise TypeError(f"Cannot build a structural key for {cls.__name__}")
+        names = _FIELD_NAMES[cls] = tuple(f.name for f in fields(cls))
+    return names
+
+
+def structural_key(obj: object) -> tuple[Any, ...]:
+    """dataclassの木を、型と子の個数を前置した平坦なタプルに展開する.
+
+    前置記法なので構造が等しいとき、かつそのときに限りキーが等しくなる。
+    明示的なスタックでたどるため、深い木でも再帰上限に達しない。
+    """
+    out: list[Any] = []
+    stack: list[object] = [obj]
+    while stack:
+        node = stack.pop()
+        cls = type(node)
+        if cls in _ATOM_TYPES:
+            # 1 と True、1 と 1.0 を区別するため型も入れる
+            out += (cls, node)
+        elif cls is tuple:
+            out += (tuple, len(node))
+            stack.extend(reversed(node))
+        else:
+            names = _field_names(cls)
+            out.append(cls)
+            stack.extend(getattr(node, name) for name in reversed(names))
+    return tuple(out)
+
+
+def structural_cache(
+    maxsize: int = 256,
+) -> Callable[[Callable[..., R]], _KeyedCache[R]]:
+    """引数の構造をキーにするキャッシュ（構造が等しい別オブジェクトも当たる）"""
+
+    def decorator(func: Callable[..., R]) -> _KeyedCache[R]:
+        return _KeyedCache(func, structural_key, maxsize)
+
+    return decorator
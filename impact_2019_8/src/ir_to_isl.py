@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+import operator
+import threading
+from collections.abc import Callable, Sequence
+from functools import lru_cache
+from typing import Any, TypeAlias
+
 import islpy as isl
 
+from ir_memo import identity_cache
 from ir_types import (
     Access,
     BinaryOp,
@@ -13,6 +20,7 @@ from ir_types import (
     Expr,
     FloatConst,
     IntConst,
+    Iterator,
     Load,
     Logical,
     PrimFunc,
@@ -23,92 +31,314 @@ from ir_types import (
     Var,
 )
 
+_TLS = threading.local()
+
+
+def default_context() -> isl.Context:
+    """スレッドごとに共有するISLコンテキストを返す.
+
+    ctxを省略した呼び出しは全てこのコンテキストを使うため、
+    別々に構築したドメイン・スケジュール・アクセスをそのまま組み合わせられる。
+    """
+    ctx = getattr(_TLS, "ctx", None)
+    if ctx is None:
+        ctx = _TLS.ctx = isl.Context()
+    return ctx
+
+
 # ==========================================
 # 1. AST -> ISL文字列 変換 (Visitor)
 # ==========================================
 
 
+# 二項演算ごとの (前置, 区切り, 後置) 文字列
+_BINOP_FMT: dict[str, tuple[str, str, str]] = {
+    "Add": ("(", " + ", ")"),
+    "Sub": ("(", " - ", ")"),
+    "Mul": ("(", " * ", ")"),
+    # ISLの除算は通常 floor(x/y) ですが、明示的にfloorを使います
+    "Div": ("floor(", " / ", ")"),
+    "FloorDiv": ("floor(", " / ", ")"),
+    "Mod": ("(", " % ", ")"),
+    "Max": ("max(", ", ", ")"),
+    "Min": ("min(", ", ", ")"),
+}
+
+_UNARY_FMT: dict[str, str] = {
+    "Neg": "-",
+    "Not": "not ",
+}
+
+# 比較演算子（前後の空白込み）
+_COMPARE_OP_MAP: dict[str, str] = {
+    "LT": " < ",
+    "LE": " <= ",
+    "GT": " > ",
+    "GE": " >= ",
+    "EQ": " = ",
+    "NE": " != ",
+}
+
+# 書き出し待ちのトークン（文字列）と展開待ちのノードを積むスタック
+_Pending: TypeAlias = "list[Expr | Constraint | str | _BinaryFrame]"
+
+
+def _emit_int(node: IntConst, stack: _Pending, out: list[str]) -> None:
+    out.append(str(node.value))
+
+
+def _emit_float(node: FloatConst, stack: _Pending, out: list[str]) -> None:
+    # ISLは整数/有理数セットのため、浮動小数は原則として整数化するか、
+    # あるいはコンテキストに応じて文字列化します。
+    out.append(str(int(node.value)))
+
+
+def _emit_var(node: Var, stack: _Pending, out: list[str]) -> None:
+    out.append(node.name)
+
+
+# 両辺が定数のときにPythonで評価できる演算（ISLの floor(x/y) は // と一致）
+_CONST_FOLDERS: dict[str, Callable[[int, int], int]] = {
+    "Add": operator.add,
+    "Sub": operator.sub,
+    "Mul": operator.mul,
+    "Div": operator.floordiv,
+    "FloorDiv": operator.floordiv,
+    "Mod": operator.mod,
+    "Max": max,
+    "Min": min,
+}
+
+# 除数が正の場合のみ、ISLとPythonで除算・剰余の結果が一致する
+_DIVISION_OPS = frozenset({"Div", "FloorDiv", "Mod"})
+
+
+class _BinaryFrame:
+    """書き出し中の二項演算の状態（出力中の位置）を保持する.
+
+    同じフレームをスタックに2回積み、左辺の後で区切りを、右辺の後で
+    畳み込みの判定と後置を書き出す。
+    """
+
+    __slots__ = ("node", "start", "mid", "sep", "suffix")
+
+    def __init__(self, node: BinaryOp, start: int, sep: str, suffix: str) -> None:
+        self.node = node
+        self.start = start
+        self.mid = -1
+        self.sep = sep
+        self.suffix = suffix
+
+
+def _emit_binary_op(
+    node: BinaryOp,
+    stack: _Pending,
+    out: list[str],
+    _formats: dict[str, tuple[str, str, str]] = _BINOP_FMT,
+) -> None:
+    try:
+        prefix, sep, suffix = _formats[node.op]
+    except KeyError:
+        raise ValueError(f"Unsupported binary op: {node.op}") from None
+    frame = _BinaryFrame(node, len(out), sep, suffix)
+    out.append(prefix)
+    # スタックなので書き出し順の逆に積む
+    stack += (frame, node.rhs, frame, node.lhs)
+
+
+def _const_operand(operand: Expr, out: list[str], lo: int, hi: int) -> int | None:
+    """書き出し済みのオペランド out[lo:hi] が整数定数ならその値を返す.
+
+    畳み込まれなかった二項演算は前置・区切り・後置を含むので、
+    1トークンになるのは整数定数か、定数に畳み込まれた二項演算だけ。
+    """
+    if hi - lo == 1 and (type(operand) is IntConst or type(operand) is BinaryOp):
+        return int(out[lo])
+    return None
+
+
+def _emit_binary_frame(frame: _BinaryFrame, stack: _Pending, out: list[str]) -> None:
+    if frame.mid < 0:
+        # 左辺の書き出しが終わった
+        frame.mid = len(out)
+        out.append(frame.sep)
+        return
+    _finish_binary_op(frame, out)
+
+
+def _finish_binary_op(frame: _BinaryFrame, out: list[str]) -> None:
+    """定数同士の演算と `x + 0`, `x * 1` などの自明な演算を畳み込む.
+
+    畳み込めなければ後置を書き出す。不要になったトークンは空文字列に
+    置き換え、出力の詰め直しは末尾の削除だけにとどめる。
+    """
+    node = frame.node
+    op = node.op
+    start, mid = frame.start, frame.mid
+    lhs = _const_operand(node.lhs, out, start + 1, mid)
+    rhs = _const_operand(node.rhs, out, mid + 1, len(out))
+    if lhs is not None and rhs is not None:
+        folder = _CONST_FOLDERS.get(op)
+        if folder is not None and (op not in _DIVISION_OPS or rhs > 0):
+            del out[start:]
+            out.append(str(folder(lhs, rhs)))
+            return
+    if op == "Add" or op == "Sub":
+        identity = 0
+    elif op == "Mul":
+        identity = 1
+    else:
+        out.append(frame.suffix)
+        return
+    if rhs == identity:
+        # 左辺だけを残す
+        del out[mid:]
+        out[start] = ""
+    elif lhs == identity and op != "Sub":
+        # 右辺だけを残す
+        out[start] = out[start + 1] = out[mid] = ""
+    else:
+        out.append(frame.suffix)
+
+
+def _emit_unary_op(
+    node: UnaryOp,
+    stack: _Pending,
+    out: list[str],
+    _prefixes: dict[str, str] = _UNARY_FMT,
+) -> None:
+    try:
+        prefix = _prefixes[node.op]
+    except KeyError:
+        raise ValueError(f"Unsupported unary op: {node.op}") from None
+    stack += (node.operand, prefix)
+
+
+def _emit_call(node: Call, stack: _Pending, out: list[str]) -> None:
+    _push_list(stack, f"{node.name}(", node.args, ")")
+
+
+def _emit_load(node: Load, stack: _Pending, out: list[str]) -> None:
+    # 注意: ISLの制約式内にメモリロードを含めることはできません。
+    # ここではアクセス解析用にインデックスを生成する目的でのみ使用を想定し、
+    # 文字列表現を返しますが、Setの定義に使うとエラーになる可能性があります。
+    _push_list(stack, f"{node.access.tensor.name}[", node.access.index, "]")
+
+
+def _emit_compare(
+    node: Compare,
+    stack: _Pending,
+    out: list[str],
+    _op_map: dict[str, str] = _COMPARE_OP_MAP,
+) -> None:
+    stack += (node.rhs, _op_map[node.op], node.lhs)
+
+
+def _emit_logical(node: Logical, stack: _Pending, out: list[str]) -> None:
+    match node.op:
+        case "And":
+            sep = " and "
+        case "Or":
+            sep = " or "
+        case _:
+            raise TypeError(f"Unknown constraint type: {type(node)}")
+    # 同じ演算の連鎖 (a and (b and c)) は入れ子にせず (a and b and c) と書き出す
+    operands: list[Constraint] = []
+    pending: list[Constraint] = [node]
+    while pending:
+        c = pending.pop()
+        if type(c) is Logical and c.op == node.op:
+            pending += (c.rhs, c.lhs)
+        else:
+            operands.append(c)
+    _push_list(stack, "(", operands, ")", sep)
+
+
+# ノードの型から書き出し関数へのディスパッチテーブル
+_EMITTERS: dict[type, Callable[[Any, _Pending, list[str]], None]] = {
+    IntConst: _emit_int,
+    FloatConst: _emit_float,
+    Var: _emit_var,
+    BinaryOp: _emit_binary_op,
+    UnaryOp: _emit_unary_op,
+    Call: _emit_call,
+    Load: _emit_load,
+    Compare: _emit_compare,
+    Logical: _emit_logical,
+    _BinaryFrame: _emit_binary_frame,
+}
+
+
+def _emit(root: Expr | Constraint, out: list[str]) -> None:
+    """式・制約ASTをISL形式のトークン列としてoutに書き出す.
+
+    再帰の代わりに明示的なスタックを使い、文字列は書き出すトークン、
+    それ以外は展開待ちのノードとして扱う。
+    """
+    stack: _Pending = [root]
+    while stack:
+        node = stack.pop()
+        if type(node) is str:
+            out.append(node)
+            continue
+        emitter = _EMITTERS.get(type(node))
+        if emitter is None:
+            if isinstance(node, Constraint):
+                raise TypeError(f"Unknown constraint type: {type(node)}")
+            raise TypeError(f"Unknown expression type: {type(node)}")
+        emitter(node, stack, out)
+
+
+def _push_list(
+    stack: _Pending,
+    prefix: str,
+    items: Sequence[Expr | Constraint],
+    suffix: str,
+    sep: str = ", ",
+) -> None:
+    """`prefix item, item, ... suffix` の書き出しをスタックに積む."""
+    stack.append(suffix)
+    for i in range(len(items) - 1, -1, -1):
+        stack.append(items[i])
+        if i:
+            stack.append(sep)
+    stack.append(prefix)
+
+
+# アクセスの収集・ドメイン構築で同じノードが何度も文字列化されるので、
+# ノードの同一性をキーに結果を覚える（木をハッシュしないので深い式でも安全）
+@identity_cache(maxsize=4096)
 def expr_to_isl(expr: Expr) -> str:
     """式ASTをISL形式の文字列に変換"""
-    if isinstance(expr, IntConst):
-        return str(expr.value)
-
-    if isinstance(expr, FloatConst):
-        # ISLは整数/有理数セットのため、浮動小数は原則として整数化するか、
-        # あるいはコンテキストに応じて文字列化します。
-        return str(int(expr.value))
-
-    if isinstance(expr, Var):
-        return expr.name
-
-    if isinstance(expr, BinaryOp):
-        lhs = expr_to_isl(expr.lhs)
-        rhs = expr_to_isl(expr.rhs)
-
-        match expr.op:
-            case "Add":
-                return f"({lhs} + {rhs})"
-            case "Sub":
-                return f"({lhs} - {rhs})"
-            case "Mul":
-                return f"({lhs} * {rhs})"
-            # ISLの除算は通常 floor(x/y) ですが、明示的にfloorを使います
-            case "Div":
-                return f"floor({lhs} / {rhs})"
-            case "FloorDiv":
-                return f"floor({lhs} / {rhs})"
-            case "Mod":
-                return f"({lhs} % {rhs})"
-            case "Max":
-                return f"max({lhs}, {rhs})"
-            case "Min":
-                return f"min({lhs}, {rhs})"
-            case _:
-                raise ValueError(f"Unsupported binary op: {expr.op}")
-
-    if isinstance(expr, UnaryOp):
-        operand = expr_to_isl(expr.operand)
-        if expr.op == "Neg":
-            return f"-{operand}"
-        if expr.op == "Not":
-            return f"not {operand}"
-
-    if isinstance(expr, Call):
-        args = ", ".join(expr_to_isl(arg) for arg in expr.args)
-        return f"{expr.name}({args})"
-
-    if isinstance(expr, Load):
-        # 注意: ISLの制約式内にメモリロードを含めることはできません。
-        # ここではアクセス解析用にインデックスを生成する目的でのみ使用を想定し、
-        # 文字列表現を返しますが、Setの定義に使うとエラーになる可能性があります。
-        idx = ", ".join(expr_to_isl(i) for i in expr.access.index)
-        return f"{expr.access.tensor.name}[{idx}]"
-
-    raise TypeError(f"Unknown expression type: {type(expr)}")
+    out: list[str] = []
+    _emit(expr, out)
+    return "".join(out)
 
 
+@identity_cache(maxsize=4096)
 def constraint_to_isl(constraint: Constraint) -> str:
     """制約ASTをISL形式の文字列に変換"""
-    if isinstance(constraint, Compare):
-        lhs = expr_to_isl(constraint.lhs)
-        rhs = expr_to_isl(constraint.rhs)
-        op_map = {"LT": "<", "LE": "<=", "GT": ">", "GE": ">=", "EQ": "=", "NE": "!="}
-        return f"{lhs} {op_map[constraint.op]} {rhs}"
-
-    if isinstance(constraint, Logical):
-        lhs = constraint_to_isl(constraint.lhs)
-        rhs = constraint_to_isl(constraint.rhs)
-        match constraint.op:
-            case "And":
-                return f"({lhs} and {rhs})"
-            case "Or":
-                return f"({lhs} or {rhs})"
-
-    raise TypeError(f"Unknown constraint type: {type(constraint)}")
-
-
-def _build_header(compute: Compute) -> tuple[str, str, str]:
-    """[Params] -> { Name[Iters] : Constraints } の各パーツを生成"""
+    out: list[str] = []
+    _emit(constraint, out)
+    return "".join(out)
+
+
+# インデックス列はAccessノードが持つタプルそのものなので、同じAccessを
+# 読み書きの両方で使う場合や、同じ関数を再構築する場合に当たる
+@identity_cache(maxsize=4096)
+def _index_to_isl(index: tuple[Expr, ...]) -> str:
+    """アクセスのインデックス列を `i, (j + 1)` 形式に変換"""
+    return ", ".join(expr_to_isl(i) for i in index)
+
+
+@identity_cache(maxsize=4096)
+def build_compute_header(compute: Compute) -> tuple[str, str, str | None]:
+    """[Params] -> { Name[Iters] : Constraints } の各パーツを生成
+
+    Computeは不変なので、ドメイン・スケジュール・アクセスの各ビルダーで
+    同じComputeの文字列化結果を共有する。
+    制約がない場合、制約部分はNoneを返す（`: 1 = 1` を付けない）。
+    """
     domain = compute.domain
 
     # パラメータ: [N, M]
@@ -119,33 +349,56 @@ def _build_header(compute: Compute) -> tuple[str, str, str]:
     tuple_str = f"{compute.name}[{', '.join(iter_names)}]"
 
     # 制約
+    const_str = None
     if domain.constraints:
-        const_parts = [constraint_to_isl(c) for c in domain.constraints]
-        const_str = " and ".join(const_parts)
-    else:
-        const_str = "1 = 1"
+        const_str = " and ".join(constraint_to_isl(c) for c in domain.constraints)
 
     return param_str, tuple_str, const_str
 
 
+def with_constraints(body: str, const_str: str | None) -> str:
+    """`body : constraints` を作る（制約がなければbodyのみ）"""
+    return f"{body} : {const_str}" if const_str is not None else body
+
+
+@lru_cache(maxsize=1024)
+def schedule_dims(
+    iterators: tuple[Iterator, ...], loop_order: tuple[str, ...]
+) -> tuple[str, ...]:
+    """ドメインに含まれるイテレータのみを、loop_orderの順序で抽出"""
+    domain_iters = {it.name for it in iterators}
+    return tuple(v for v in loop_order if v in domain_iters)
+
+
+def _merged_param_str(computes: tuple[Compute, ...]) -> str:
+    """全Computeのパラメータを出現順に重複なく並べた `[N, M]` を返す"""
+    names: dict[str, None] = {}
+    for compute in computes:
+        for name in compute.domain.params:
+            names[name] = None
+    return f"[{', '.join(names)}]"
+
+
 def build_domain(func: PrimFunc, ctx: isl.Context | None = None) -> isl.UnionSet:
     """
     計算領域 (Iteration Domain) を構築
-    ISL Set: [Params] -> { Stmt[iters] : constraints }
+    ISL Set: [Params] -> { Stmt1[iters] : constraints; Stmt2[iters] : ... }
+
+    Computeごとにパースしてunionを取るのではなく、全体を一度にパースする。
     """
-    ctx = ctx or isl.Context()
-    u_set = isl.UnionSet("{ }", ctx)
+    ctx = ctx or default_context()
+    if not func.computes:
+        return isl.UnionSet("{ }", ctx)
 
+    fragments: list[str] = []
     for compute in func.computes:
-        param_str, tuple_str, const_str = _build_header(compute)
-        isl_str = f"{param_str} -> {{ {tuple_str} : {const_str} }}"
-        try:
-            dom = isl.UnionSet(isl_str, ctx)
-            u_set = u_set.union(dom)
-        except isl.Error as e:
-            raise RuntimeError(f"Failed to build ISL domain: {isl_str}") from e
-
-    return u_set
+        _, tuple_str, const_str = build_compute_header(compute)
+        fragments.append(with_constraints(tuple_str, const_str))
+    isl_str = f"{_merged_param_str(func.computes)} -> {{ {'; '.join(fragments)} }}"
+    try:
+        return isl.UnionSet(isl_str, ctx)
+    except isl.Error as e:
+        raise RuntimeError(f"Failed to build ISL domain: {isl_str}") from e
 
 
 def build_schedule(func: PrimFunc, ctx: isl.Context | None = None) -> isl.UnionMap:
@@ -159,152 +412,190 @@ def build_schedule(func: PrimFunc, ctx: isl.Context | None = None) -> isl.UnionM
 
     stmt_idを末尾に置くことで、同じイテレータを持つループは融合可能になる。
     """
-    ctx = ctx or isl.Context()
-    u_map = isl.UnionMap("{ }", ctx)
+    ctx = ctx or default_context()
+    if not func.computes:
+        return isl.UnionMap("{ }", ctx)
 
     global_loop_order = func.schedule.loop_order
     add_stmt_id = len(func.computes) >= 2
 
+    fragments: list[str] = []
     for stmt_id, compute in enumerate(func.computes):
-        param_str, src_tuple_str, const_str = _build_header(compute)
+        _, src_tuple_str, const_str = build_compute_header(compute)
 
-        # このドメインに含まれるイテレータのみを、global_loop_orderの順序で抽出
-        domain_iters = {it.name for it in compute.domain.iterators}
-        sched_dims = [v for v in global_loop_order if v in domain_iters]
+        sched_dims = schedule_dims(compute.domain.iterators, global_loop_order)
 
         # 複数Computeの場合、末尾にstmt_idを追加（ループ融合を可能にするため）
         if add_stmt_id:
             dst_tuple_str = f"[{', '.join(sched_dims)}, {stmt_id}]"
         else:
             dst_tuple_str = f"[{', '.join(sched_dims)}]"
-        isl_str = (
-            f"{param_str} -> {{ {src_tuple_str} -> {dst_tuple_str} : {const_str} }}"
+        fragments.append(
+            with_constraints(f"{src_tuple_str} -> {dst_tuple_str}", const_str)
         )
 
-        try:
-            m = isl.UnionMap(isl_str, ctx)
-            u_map = u_map.union(m)
-        except isl.Error as e:
-            raise RuntimeError(f"Failed to build ISL schedule: {isl_str}") from e
+    isl_str = f"{_merged_param_str(func.computes)} -> {{ {'; '.join(fragments)} }}"
+    try:
+        return isl.UnionMap(isl_str, ctx)
+    except isl.Error as e:
+        raise RuntimeError(f"Failed to build ISL schedule: {isl_str}") from e
+
+
+# (アクセス, 述語, 書き込みかどうか)
+AccessInfo: TypeAlias = tuple[Access, Constraint | None, bool]
 
-    return u_map
 
+def _collect_stmt_accesses(s: Stmt, results: list[AccessInfo]) -> None:
+    """Block以外の単一の文のアクセス情報をresultsに追加"""
+    if isinstance(s, Store):
+        # Write Access
+        results.append((s.access, s.predicate, True))
 
-def _collect_accesses(stmt: Stmt) -> list[tuple[Access, Constraint | None, bool]]:
+        # Read Access (RHS & Index)
+        # Readは「文が実行される条件」下で発生
+        _collect_expr_reads(s.value, results, s.predicate)
+        _collect_index_reads(s.access.index, results, s.predicate)
+
+    elif isinstance(s, ReduceStore):
+        # Reduceは Read-Modify-Write
+        results.append((s.access, None, True))  # Write
+        results.append((s.access, None, False))  # Read (self)
+
+        _collect_expr_reads(s.value, results, None)
+        if s.init:
+            _collect_expr_reads(s.init, results, None)
+        _collect_index_reads(s.access.index, results, None)
+
+
+def _collect_accesses(stmt: Stmt) -> list[AccessInfo]:
     """
     文をトラバースしてアクセス情報を収集
     Returns: list of (Access, Predicate, is_write)
     """
-    results = []
-
-    def visit(s: Stmt, preds: list[Constraint]):
-        # 現在の述語(条件)を構築
-        curr_pred = None
-        if preds:
-            curr_pred = preds[0]
-            for p in preds[1:]:
-                curr_pred = Logical("And", curr_pred, p)
-
+    results: list[AccessInfo] = []
+    # 大半のComputeは単一のStore/ReduceStoreなので、スタックを使わずに処理する
+    if not isinstance(stmt, Block):
+        _collect_stmt_accesses(stmt, results)
+        return results
+
+    # Blockは述語を持たないので、各文の述語はStore固有のものだけになる
+    stack: list[Stmt] = [stmt]
+    while stack:
+        s = stack.pop()
         if isinstance(s, Block):
-            for child in s.stmts:
-                visit(child, preds)
-
-        elif isinstance(s, Store):
-            # Write Access
-            # Store固有のpredicateがあれば追加
-            write_preds = list(preds)
-            if s.predicate:
-                write_preds.append(s.predicate)
-
-            # Write Predicate結合
-            w_pred_obj = curr_pred
-            if s.predicate:
-                w_pred_obj = (
-                    Logical("And", curr_pred, s.predicate) if curr_pred else s.predicate
-                )
-
-            results.append((s.access, w_pred_obj, True))
-
-            # Read Access (RHS & Index)
-            # Readは「文が実行される条件」下で発生
-            _collect_expr_reads(s.value, results, w_pred_obj)
-            for idx in s.access.index:
-                _collect_expr_reads(idx, results, w_pred_obj)
-
-        elif isinstance(s, ReduceStore):
-            # Reduceは Read-Modify-Write
-            results.append((s.access, curr_pred, True))  # Write
-            results.append((s.access, curr_pred, False))  # Read (self)
-
-            _collect_expr_reads(s.value, results, curr_pred)
-            if s.init:
-                _collect_expr_reads(s.init, results, curr_pred)
-            for idx in s.access.index:
-                _collect_expr_reads(idx, results, curr_pred)
-
-    visit(stmt, [])
+            # 出現順に処理するため逆順に積む
+            stack.extend(reversed(s.stmts))
+        else:
+            _collect_stmt_accesses(s, results)
+
     return results
 
 
-def _collect_expr_reads(expr: Expr, acc_list: list, pred: Constraint | None):
-    """式中のLoadを再帰的に収集"""
-    if isinstance(expr, Load):
-        acc_list.append((expr.access, pred, False))
-        for idx in expr.access.index:
+# 子の式を持つノードの型から、その子を取り出す関数へのテーブル
+# （定数・変数は子を持たないので登録しない）
+_CHILD_EXPRS: dict[type, Callable[[Any], tuple[Expr, ...]]] = {
+    Load: lambda e: e.access.index,
+    BinaryOp: lambda e: (e.lhs, e.rhs),
+    UnaryOp: lambda e: (e.operand,),
+    Call: lambda e: e.args,
+}
+
+
+def _collect_index_reads(
+    index: tuple[Expr, ...], acc_list: list[AccessInfo], pred: Constraint | None
+) -> None:
+    """インデックス中のLoadを収集（変数・定数だけのインデックスは走査しない）"""
+    for idx in index:
+        if type(idx) in _CHILD_EXPRS:
             _collect_expr_reads(idx, acc_list, pred)
-    elif isinstance(expr, BinaryOp):
-        _collect_expr_reads(expr.lhs, acc_list, pred)
-        _collect_expr_reads(expr.rhs, acc_list, pred)
-    elif isinstance(expr, UnaryOp):
-        _collect_expr_reads(expr.operand, acc_list, pred)
-    elif isinstance(expr, Call):
-        for arg in expr.args:
-            _collect_expr_reads(arg, acc_list, pred)
-
-
-def _build_access_map_generic(
-    func: PrimFunc, want_write: bool, ctx: isl.Context
-) -> isl.UnionMap:
-    u_map = isl.UnionMap("{ }", ctx)
 
-    for compute in func.computes:
-        param_str, src_tuple_str, domain_const_str = _build_header(compute)
-        accesses = _collect_accesses(compute.body)
 
-        for access, pred, is_write in accesses:
-            if is_write != want_write:
+def _collect_expr_reads(
+    expr: Expr, acc_list: list[AccessInfo], pred: Constraint | None
+) -> None:
+    """式中のLoadを前順で収集"""
+    stack: list[Expr] = [expr]
+    while stack:
+        e = stack.pop()
+        children = _CHILD_EXPRS.get(type(e))
+        if children is None:
+            continue
+        if type(e) is Load:
+            acc_list.append((e.access, pred, False))
+        stack.extend(reversed(children(e)))
+
+
+def _parse_access_fragments(
+    param_str: str, fragments: list[str], ctx: isl.Context
+) -> isl.UnionMap:
+    """アクセスの断片を一度にパースし、失敗した場合のみ個別にパースする"""
+    if not fragments:
+        return isl.UnionMap("{ }", ctx)
+    try:
+        u_map = isl.UnionMap(f"{param_str} -> {{ {'; '.join(fragments)} }}", ctx)
+    except isl.Error:
+        # 非アフィンなインデックス等を含む断片だけをスキップする
+        u_map = isl.UnionMap("{ }", ctx)
+        for fragment in fragments:
+            try:
+                m = isl.UnionMap(f"{param_str} -> {{ {fragment} }}", ctx)
+            except isl.Error:
                 continue
+            u_map = u_map.union(m)
+    return u_map.coalesce()
 
+
+def build_access_maps(
+    func: PrimFunc, ctx: isl.Context | None = None
+) -> tuple[isl.UnionMap, isl.UnionMap]:
+    """
+    書き込み・読み込みアクセスマップを一度のトラバースで構築
+    ISL Map: [Params] -> { Stmt[iters] -> Tensor[index] : constraints }
+
+    Returns: (write_access, read_access)
+    """
+    ctx = ctx or default_context()
+    write_fragments: list[str] = []
+    read_fragments: list[str] = []
+
+    for compute in func.computes:
+        _, src_tuple_str, domain_const_str = build_compute_header(compute)
+        # アクセスごとに変わらない部分はループの外で組み立てておく
+        prefix = f"{src_tuple_str} -> "
+        domain_suffix = with_constraints("", domain_const_str)
+
+        for access, pred, is_write in _collect_accesses(compute.body):
             try:
                 # インデックス式文字列化
-                idx_str = ", ".join(expr_to_isl(i) for i in access.index)
-                tensor_acc = f"{access.tensor.name}[{idx_str}]"
+                tensor_acc = f"{access.tensor.name}[{_index_to_isl(access.index)}]"
 
                 # 制約結合
-                full_const = domain_const_str
-                if pred:
+                if pred and domain_const_str is not None:
                     pred_str = constraint_to_isl(pred)
-                    full_const = f"({full_const}) and ({pred_str})"
-
-                isl_str = (
-                    f"{param_str} -> {{ {src_tuple_str} -> {tensor_acc} : "
-                    f"{full_const} }}"
-                )
-                m = isl.UnionMap(isl_str, ctx)
-                u_map = u_map.union(m)
-            except (ValueError, isl.Error):
-                # 非アフィンなインデックス等で生成できない場合はスキップ
+                    suffix = f" : ({domain_const_str}) and ({pred_str})"
+                elif pred:
+                    suffix = f" : {constraint_to_isl(pred)}"
+                else:
+                    suffix = domain_suffix
+            except ValueError:
+                # ISL形式に変換できない式を含む場合はスキップ
                 continue
+            fragments = write_fragments if is_write else read_fragments
+            fragments.append(prefix + tensor_acc + suffix)
 
-    return u_map
+    param_str = _merged_param_str(func.computes)
+    return (
+        _parse_access_fragments(param_str, write_fragments, ctx),
+        _parse_access_fragments(param_str, read_fragments, ctx),
+    )
 
 
 def build_write_access(func: PrimFunc, ctx: isl.Context | None = None) -> isl.UnionMap:
-    return _build_access_map_generic(func, True, ctx or isl.Context())
+    return build_access_maps(func, ctx)[0]
 
 
 def build_read_access(func: PrimFunc, ctx: isl.Context | None = None) -> isl.UnionMap:
-    return _build_access_map_generic(func, False, ctx or isl.Context())
+    return build_access_maps(func, ctx)[1]
 
 
 # ==========================================
@@ -316,18 +607,22 @@ def compute_raw_dependence(
     schedule: isl.UnionMap,
     write_access: isl.UnionMap,
     read_access: isl.UnionMap,
+    before: isl.UnionMap | None = None,
 ) -> isl.UnionMap:
     """
     RAW (Read After Write) 依存関係を計算
     フロー依存: 書き込み → 読み込み (同じ配列要素、書き込みが先)
 
+    beforeに schedule.lex_lt_union_map(schedule) を渡すと再計算を省略する
+
     Returns: { S_write[...] -> S_read[...] }
     """
     # 同じ配列要素へのアクセスペア: S_write -> S_read
     same_access = write_access.apply_range(read_access.reverse())
 
     # 時間順序: 書き込みが読み込みより前
-    before = schedule.lex_lt_union_map(schedule)
+    if before is None:
+        before = schedule.lex_lt_union_map(schedule)
 
     return same_access.intersect(before)
 
@@ -336,18 +631,22 @@ def compute_war_dependence(
     schedule: isl.UnionMap,
     write_access: isl.UnionMap,
     read_access: isl.UnionMap,
+    before: isl.UnionMap | None = None,
 ) -> isl.UnionMap:
     """
     WAR (Write After Read) 依存関係を計算
     反依存: 読み込み → 書き込み (同じ配列要素、読み込みが先)
 
+    beforeに schedule.lex_lt_union_map(schedule) を渡すと再計算を省略する
+
     Returns: { S_read[...] -> S_write[...] }
     """
     # 同じ配列要素へのアクセスペア: S_read -> S_write
     same_access = read_access.apply_range(write_access.reverse())
 
     # 時間順序: 読み込みが書き込みより前
-    before = schedule.lex_lt_union_map(schedule)
+    if before is None:
+        before = schedule.lex_lt_union_map(schedule)
 
     return same_access.intersect(before)
 
@@ -355,11 +654,14 @@ def compute_war_dependence(
 def compute_waw_dependence(
     schedule: isl.UnionMap,
     write_access: isl.UnionMap,
+    before: isl.UnionMap | None = None,
 ) -> isl.UnionMap:
     """
     WAW (Write After Write) 依存関係を計算
     出力依存: 書き込み → 書き込み (同じ配列要素)
 
+    beforeに schedule.lex_lt_union_map(schedule) を渡すと再計算を省略する
+
     Returns: { S_write1[...] -> S_write2[...] }
     """
     # 同じ配列要素への書き込みペア
@@ -368,11 +670,28 @@ def compute_waw_dependence(
     # 時間順序: 最初の書き込みが後の書き込みより前
     # lex_lt は厳密な「より小さい」なので、自己ループ (S[i] -> S[i]) は
     # schedule(S[i]) < schedule(S[i]) が偽となり自動的に除外される
-    before = schedule.lex_lt_union_map(schedule)
+    if before is None:
+        before = schedule.lex_lt_union_map(schedule)
 
     return same_access.intersect(before)
 
 
+def compute_union_dependence(
+    schedule: isl.UnionMap,
+    write_access: isl.UnionMap,
+    read_access: isl.UnionMap,
+) -> isl.UnionMap:
+    """
+    RAW/WAR/WAWをまとめた依存関係を計算
+    時間順序 (lex_lt_union_map) は3種類で共通なので一度だけ計算する
+    """
+    before = schedule.lex_lt_union_map(schedule)
+    raw_dep = compute_raw_dependence(schedule, write_access, read_access, before)
+    war_dep = compute_war_dependence(schedule, write_access, read_access, before)
+    waw_dep = compute_waw_dependence(schedule, write_access, before)
+    return raw_dep.union(war_dep).union(waw_dep)
+
+
 def compute_all_dependences(
     func: PrimFunc,
     ctx: isl.Context | None = None,
@@ -382,13 +701,14 @@ def compute_all_dependences(
 
     Returns: {"RAW": ..., "WAR": ..., "WAW": ...}
     """
-    ctx = ctx or isl.Context()
+    ctx = ctx or default_context()
     schedule = build_schedule(func, ctx)
-    write_access = build_write_access(func, ctx)
-    read_access = build_read_access(func, ctx)
+    write_access, read_access = build_access_maps(func, ctx)
+    # 時間順序はRAW/WAR/WAWで共通なので一度だけ計算する
+    before = schedule.lex_lt_union_map(schedule)
 
     return {
-        "RAW": compute_raw_dependence(schedule, write_access, read_access),
-        "WAR": compute_war_dependence(schedule, write_access, read_access),
-        "WAW": compute_waw_dependence(schedule, write_access),
+        "RAW": compute_raw_dependence(schedule, write_access, read_access, before),
+        "WAR": compute_war_dependence(schedule, write_access, read_access, before),
+        "WAW": compute_waw_dependence(schedule, write_access, before),
     }
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass
 from typing import Literal, TypeAlias, Union
 
@@ -28,35 +29,35 @@ AxisKind: TypeAlias = Literal["spatial", "reduce"]
 ReduceOpKind: TypeAlias = Literal["Sum", "Prod", "Max", "Min"]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Expr:
     """式の基底クラス"""
 
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class IntConst(Expr):
     """整数定数"""
 
     value: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FloatConst(Expr):
     """浮動小数点定数 (計算本体のRHS等で使用)"""
 
     value: float
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Var(Expr):
     """変数参照 (イテレータ変数 または パラメータ)"""
 
     name: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class BinaryOp(Expr):
     """二項演算: lhs op rhs
     例: i + 1, i % 2, min(N, M)
@@ -67,7 +68,7 @@ class BinaryOp(Expr):
     rhs: Expr
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class UnaryOp(Expr):
     """単項演算: op operand"""
 
@@ -75,7 +76,7 @@ class UnaryOp(Expr):
     operand: Expr
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Call(Expr):
     """関数呼び出し
     ISLの特殊関数 (floor, ceil) や外部関数呼び出し用
@@ -85,14 +86,14 @@ class Call(Expr):
     args: tuple[Expr, ...]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Constraint:
     """制約の基底クラス"""
 
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Compare(Constraint):
     """比較制約: lhs op rhs
     例: i < N
@@ -103,7 +104,7 @@ class Compare(Constraint):
     rhs: Expr
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Logical(Constraint):
     """論理結合: lhs op rhs
     例: (0 <= i) and (i < N)
@@ -114,15 +115,19 @@ class Logical(Constraint):
     rhs: Constraint
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Iterator:
     """ループ変数の定義"""
 
     name: str
     kind: AxisKind = "spatial"
 
+    def __post_init__(self) -> None:
+        # 同名のイテレータは生成コード中で何度も現れるので文字列を共有する
+        object.__setattr__(self, "name", sys.intern(self.name))
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class Domain:
     """
     反復空間定義
@@ -151,14 +156,17 @@ Shape: TypeAlias = tuple[Expr, ...]
 Index: TypeAlias = tuple[Expr, ...]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Tensor:
     name: str
     shape: Shape
     dtype: str = "float32"
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "name", sys.intern(self.name))
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Access:
     """テンソルアクセス共通構造"""
 
@@ -169,14 +177,14 @@ class Access:
 Stmt: TypeAlias = Union["Store", "ReduceStore", "Block"]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Load(Expr):
     """ロード式 (式の一部として埋め込まれる)"""
 
     access: Access
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Store:
     """ストア文"""
 
@@ -186,7 +194,7 @@ class Store:
     predicate: Constraint | None = None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ReduceStore:
     """リダクション文: A[i] += value"""
 
@@ -196,28 +204,28 @@ class ReduceStore:
     init: Expr | None = None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Block:
     """文のブロック"""
 
     stmts: tuple[Stmt, ...]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Compute:
     name: str
     domain: Domain
     body: Stmt
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Schedule:
     """スケジューリング情報"""
 
     loop_order: tuple[str, ...]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PrimFunc:
     name: str
     params: tuple[Tensor, ...]  # 入出力引数
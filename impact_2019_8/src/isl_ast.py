@@ -12,3 +12,11 @@ def build_ast_from_domain_and_schedule(
     schedule = schedule.intersect_domain(domain)
     build = isl.AstBuild.alloc(ctx)
     return build.node_from_schedule_map(schedule)
+
+
+def build_ast_from_schedule(schedule: isl.Schedule) -> isl.AstNode:
+    """スケジュールツリーからASTを生成する."""
+    # AstBuild.allocはパラメータなしの全体集合をコンテキストとするので、
+    # "{ : }" を毎回パースしてfrom_contextに渡すのと等価
+    build = isl.AstBuild.alloc(schedule.get_ctx())
+    return build.node_from_schedule(schedule)
@@ -2,6 +2,10 @@
 
 from __future__ import annotations
 
+import sys
+from collections.abc import Callable
+from functools import lru_cache
+
 import islpy as isl
 
 from ast_types import (
@@ -50,23 +54,20 @@ _OP_TYPE_MAP: dict[isl.ast_expr_op_type, str] = {
     isl.ast_expr_op_type.call: "call",
 }
 
+# 列挙値は小さな連続した整数なので、値で直接引けるタプルに展開しておく
+_OP_TYPE_TABLE: tuple[str | None, ...] = tuple(
+    _OP_TYPE_MAP.get(isl.ast_expr_op_type(value))
+    for value in range(max(op.value for op in _OP_TYPE_MAP) + 1)
+)
+
 
 def convert_ast_node(node: isl.AstNode) -> AstResult:
     """isl.AstNode を ast_types に変換する."""
-    node_type = node.get_type()
-
-    if node_type == isl.ast_node_type.for_:
-        return _convert_for_loop(node)
-    elif node_type == isl.ast_node_type.block:
-        return _convert_block(node)
-    elif node_type == isl.ast_node_type.user:
-        user = _convert_user(node)
-        return Block(stmts=(user,))
-    elif node_type == isl.ast_node_type.if_:
-        guard = _convert_guard(node)
-        return Block(stmts=(guard,))
-    else:
-        raise ValueError(f"Unsupported node type: {node_type}")
+    body = _convert_body(node)
+    # ルートはForLoopかBlockに揃える（User/GuardはBlockで包む）
+    if isinstance(body, (ForLoop, Block)):
+        return body
+    return Block(stmts=(body,))
 
 
 def _convert_for_loop(node: isl.AstNode) -> ForLoop:
@@ -97,30 +98,19 @@ def _convert_for_loop(node: isl.AstNode) -> ForLoop:
 def _convert_body(node: isl.AstNode) -> Body:
     """body ノードを変換する."""
     node_type = node.get_type()
-
-    if node_type == isl.ast_node_type.for_:
-        return _convert_for_loop(node)
-    elif node_type == isl.ast_node_type.user:
-        return _convert_user(node)
-    elif node_type == isl.ast_node_type.block:
-        return _convert_block(node)
-    elif node_type == isl.ast_node_type.if_:
-        return _convert_guard(node)
-    else:
+    converter = _BODY_CONVERTERS.get(node_type.value)
+    if converter is None:
         raise ValueError(f"Unsupported body node type: {node_type}")
+    return converter(node)
 
 
 def _convert_block(node: isl.AstNode) -> Block:
     """block ノードを変換する."""
     children = node.block_get_children()
-    n = children.n_ast_node()
-    stmts: list[Body] = []
-
-    for i in range(n):
-        child = children.get_at(i)
-        stmts.append(_convert_body(child))
-
-    return Block(stmts=tuple(stmts))
+    get_at = children.get_at
+    return Block(
+        stmts=tuple([_convert_body(get_at(i)) for i in range(children.n_ast_node())])
+    )
 
 
 def _convert_user(node: isl.AstNode) -> User:
@@ -142,17 +132,24 @@ def _convert_guard(node: isl.AstNode) -> Guard:
     return Guard(cond=cond_expr, then=then_body)
 
 
+# isl.ast_node_type の値から変換関数へのディスパッチテーブル
+_BODY_CONVERTERS: dict[int, Callable[[isl.AstNode], Body]] = {
+    isl.ast_node_type.for_.value: _convert_for_loop,
+    isl.ast_node_type.user.value: _convert_user,
+    isl.ast_node_type.block.value: _convert_block,
+    isl.ast_node_type.if_.value: _convert_guard,
+}
+
+
 def _convert_expr(expr: isl.AstExpr) -> Expr:
     """isl.AstExpr を ast_types.Expr に変換する."""
     expr_type = expr.get_type()
 
     if expr_type == isl.ast_expr_type.id:
-        id_obj = expr.get_id()
-        return Id(name=id_obj.get_name())
+        return _make_id(expr.get_id().get_name())
 
     elif expr_type == isl.ast_expr_type.int:
-        val_obj = expr.get_val()
-        return Val(value=val_obj.get_num_si())
+        return _make_val(expr.get_val().get_num_si())
 
     elif expr_type == isl.ast_expr_type.op:
         return _convert_op_expr(expr)
@@ -161,21 +158,35 @@ def _convert_expr(expr: isl.AstExpr) -> Expr:
         raise ValueError(f"Unsupported expression type: {expr_type}")
 
 
+# islpyはアクセスの度に新しいラッパーオブジェクトを返すため、isl側の
+# オブジェクトの同一性では共通部分式を検出できない。代わりに頻出する葉ノードを
+# 値ごとに一つだけ作り、ループ変数やCompute名の参照を共有する
+@lru_cache(maxsize=4096)
+def _make_id(name: str) -> Id:
+    return Id(name=sys.intern(name))
+
+
+@lru_cache(maxsize=4096)
+def _make_val(value: int) -> Val:
+    return Val(value=value)
+
+
 def _convert_op_expr(expr: isl.AstExpr) -> Expr:
     """演算子式を変換する."""
     op_type = expr.get_op_type()
     n_arg = expr.get_op_n_arg()
 
-    # 演算子名を取得
-    if op_type not in _OP_TYPE_MAP:
+    # 演算子名を取得（error等の負の値や表にない演算子は未対応）
+    value = op_type.value
+    op_name = _OP_TYPE_TABLE[value] if 0 <= value < len(_OP_TYPE_TABLE) else None
+    if op_name is None:
         raise ValueError(f"Unsupported operator type: {op_type}")
-    op_name = _OP_TYPE_MAP[op_type]
 
     # 引数を変換
-    args = [_convert_expr(expr.get_op_arg(i)) for i in range(n_arg)]
+    args = tuple(_convert_expr(expr.get_op_arg(i)) for i in range(n_arg))
 
     # call は特別扱い
-    if op_type == isl.ast_expr_op_type.call:
+    if op_name == "call":
         return Call(args=args)
 
     # 単項演算子
@@ -186,11 +197,17 @@ def _convert_op_expr(expr: isl.AstExpr) -> Expr:
     if n_arg == 2:
         return BinOp(op=op_name, left=args[0], right=args[1])
 
-    # 多引数のmax/minはネストした二項演算に変換
+    # 多引数のmax/minは隣り合う要素を組にして、深さO(log n)の二項演算の木に変換
     if n_arg > 2 and op_name in ("max", "min"):
-        result = args[0]
-        for arg in args[1:]:
-            result = BinOp(op=op_name, left=result, right=arg)
-        return result
+        level: list[Expr] = list(args)
+        while len(level) > 1:
+            paired: list[Expr] = [
+                BinOp(op=op_name, left=left, right=right)
+                for left, right in zip(level[::2], level[1::2], strict=False)
+            ]
+            if len(level) % 2:
+                paired.append(level[-1])
+            level = paired
+        return level[0]
 
     raise ValueError(f"Unexpected number of args: {n_arg} for op {op_name}")
@@ -7,21 +7,26 @@ import islpy as isl
 
 from ast_types import Block, ForLoop, Guard
 from ir_to_isl import (
+    build_access_maps,
+    build_compute_header,
     build_domain,
-    build_read_access,
-    build_write_access,
-    compute_raw_dependence,
-    compute_war_dependence,
-    compute_waw_dependence,
-    constraint_to_isl,
+    compute_union_dependence,
+    default_context,
+    schedule_dims,
+    with_constraints,
 )
 from ir_types import Compute, PrimFunc, Schedule, Tensor
-from isl_ast import build_ast_from_domain_and_schedule
+from isl_ast import build_ast_from_domain_and_schedule, build_ast_from_schedule
 from isl_ast_converter import convert_ast_node
 
+_INVALID_NAME_CHAR_RE = re.compile(r"[^0-9A-Za-z_]")
+
 
 def _sanitize_name(name: str) -> str:
-    cleaned = re.sub(r"[^0-9A-Za-z_]", "_", name)
+    # 大半の名前はそのままCの識別子として使えるので正規表現を通さない
+    if name.isascii() and name.isidentifier():
+        return name
+    cleaned = _INVALID_NAME_CHAR_RE.sub("_", name)
     if not cleaned:
         return "anon"
     if cleaned[0].isdigit():
@@ -29,22 +34,6 @@ def _sanitize_name(name: str) -> str:
     return cleaned
 
 
-def _build_header(compute: Compute) -> tuple[str, str, str]:
-    domain = compute.domain
-    param_str = f"[{', '.join(domain.params)}]" if domain.params else "[]"
-
-    iter_names = [it.name for it in domain.iterators]
-    tuple_str = f"{compute.name}[{', '.join(iter_names)}]"
-
-    if domain.constraints:
-        const_parts = [constraint_to_isl(c) for c in domain.constraints]
-        const_str = " and ".join(const_parts)
-    else:
-        const_str = "1 = 1"
-
-    return param_str, tuple_str, const_str
-
-
 def _tag_primfunc(func: PrimFunc, func_idx: int) -> PrimFunc:
     prefix = f"f{func_idx}_{_sanitize_name(func.name)}"
     tagged_computes = tuple(
@@ -64,33 +53,29 @@ def _tag_primfunc(func: PrimFunc, func_idx: int) -> PrimFunc:
 
 
 def _merge_params(funcs: Sequence[PrimFunc]) -> tuple[Tensor, ...]:
+    # dictは挿入順を保持するので、出現順の引数リストとしてそのまま使える
     seen: dict[str, Tensor] = {}
-    ordered: list[str] = []
     for func in funcs:
         for tensor in func.params:
             existing = seen.get(tensor.name)
             if existing is None:
                 seen[tensor.name] = tensor
-                ordered.append(tensor.name)
                 continue
             if existing.shape != tensor.shape or existing.dtype != tensor.dtype:
                 raise ValueError(
                     f"Tensor param conflict for '{tensor.name}': "
                     f"{existing.shape}/{existing.dtype} vs {tensor.shape}/{tensor.dtype}"
                 )
-    return tuple(seen[name] for name in ordered)
+    return tuple(seen.values())
 
 
 def _collect_param_names(funcs: Sequence[PrimFunc]) -> list[str]:
-    names: list[str] = []
-    seen: set[str] = set()
+    names: dict[str, None] = {}
     for func in funcs:
         for compute in func.computes:
             for name in compute.domain.params:
-                if name not in seen:
-                    seen.add(name)
-                    names.append(name)
-    return names
+                names[name] = None
+    return list(names)
 
 
 def _build_param_space(ctx: isl.Context, params: list[str]) -> isl.Space:
@@ -120,15 +105,23 @@ def _build_union_accesses(
     write_access = isl.UnionMap("{ }", ctx)
     read_access = isl.UnionMap("{ }", ctx)
     for func in funcs:
-        write_access = write_access.union(
-            build_write_access(func, ctx).align_params(param_space)
-        )
-        read_access = read_access.union(
-            build_read_access(func, ctx).align_params(param_space)
-        )
+        func_write, func_read = build_access_maps(func, ctx)
+        write_access = write_access.union(func_write.align_params(param_space))
+        read_access = read_access.union(func_read.align_params(param_space))
     return write_access, read_access
 
 
+def _padded_sched_iters(
+    compute: Compute,
+    loop_order: tuple[str, ...],
+    max_loop_depth: int,
+) -> list[str]:
+    sched_iters = list(schedule_dims(compute.domain.iterators, loop_order))
+    if len(sched_iters) < max_loop_depth:
+        sched_iters.extend(["0"] * (max_loop_depth - len(sched_iters)))
+    return sched_iters
+
+
 def _build_base_schedule(
     funcs: Sequence[PrimFunc],
     ctx: isl.Context,
@@ -139,19 +132,12 @@ def _build_base_schedule(
     for func_idx, func in enumerate(funcs):
         loop_order = func.schedule.loop_order
         for stmt_id, compute in enumerate(func.computes):
-            param_str, src_tuple_str, const_str = _build_header(compute)
-
-            iter_names = {it.name for it in compute.domain.iterators}
-            sched_iters = [name for name in loop_order if name in iter_names]
-
-            if len(sched_iters) < max_loop_depth:
-                sched_iters.extend(["0"] * (max_loop_depth - len(sched_iters)))
-
+            param_str, src_tuple_str, const_str = build_compute_header(compute)
+            sched_iters = _padded_sched_iters(compute, loop_order, max_loop_depth)
             dst_dims = [str(func_idx)] + sched_iters + [str(stmt_id)]
             dst_tuple_str = f"[{', '.join(dst_dims)}]"
-            isl_str = (
-                f"{param_str} -> {{ {src_tuple_str} -> {dst_tuple_str} : {const_str} }}"
-            )
+            body = with_constraints(f"{src_tuple_str} -> {dst_tuple_str}", const_str)
+            isl_str = f"{param_str} -> {{ {body} }}"
             schedule = schedule.union(isl.UnionMap(isl_str, ctx))
 
     return schedule.align_params(param_space)
@@ -168,19 +154,12 @@ def _build_fused_schedule(
     for func_idx, func in enumerate(funcs):
         loop_order = func.schedule.loop_order
         for compute in func.computes:
-            param_str, src_tuple_str, const_str = _build_header(compute)
-
-            iter_names = {it.name for it in compute.domain.iterators}
-            sched_iters = [name for name in loop_order if name in iter_names]
-
-            if len(sched_iters) < max_loop_depth:
-                sched_iters.extend(["0"] * (max_loop_depth - len(sched_iters)))
-
+            param_str, src_tuple_str, const_str = build_compute_header(compute)
+            sched_iters = _padded_sched_iters(compute, loop_order, max_loop_depth)
             dst_dims = sched_iters + [str(func_idx), str(stmt_counter)]
             dst_tuple_str = f"[{', '.join(dst_dims)}]"
-            isl_str = (
-                f"{param_str} -> {{ {src_tuple_str} -> {dst_tuple_str} : {const_str} }}"
-            )
+            body = with_constraints(f"{src_tuple_str} -> {dst_tuple_str}", const_str)
+            isl_str = f"{param_str} -> {{ {body} }}"
             schedule = schedule.union(isl.UnionMap(isl_str, ctx))
             stmt_counter += 1
 
@@ -210,15 +189,15 @@ def _schedule_respects_deps(
 
 
 def _unwrap_single_loop_root(node: Block | ForLoop | Guard) -> ForLoop | None:
-    if isinstance(node, ForLoop):
-        return node
-    if isinstance(node, Guard):
-        return _unwrap_single_loop_root(node.then)
-    if isinstance(node, Block):
-        if len(node.stmts) != 1:
+    while True:
+        if isinstance(node, ForLoop):
+            return node
+        if isinstance(node, Guard):
+            node = node.then
+        elif isinstance(node, Block) and len(node.stmts) == 1:
+            node = node.stmts[0]
+        else:
             return None
-        return _unwrap_single_loop_root(node.stmts[0])
-    return None
 
 
 def _ensure_single_loop_nest(ast_root: Block | ForLoop | Guard) -> None:
@@ -232,7 +211,7 @@ def build_fused_ast(
     if not funcs:
         raise ValueError("compile_fused() received an empty PrimFunc list")
 
-    ctx = isl.Context()
+    ctx = default_context()
     tagged_funcs = [_tag_primfunc(func, idx) for idx, func in enumerate(funcs)]
 
     param_names = _collect_param_names(tagged_funcs)
@@ -249,10 +228,7 @@ def build_fused_ast(
 
     write_access, read_access = _build_union_accesses(tagged_funcs, ctx, param_space)
 
-    raw_dep = compute_raw_dependence(base_schedule, write_access, read_access)
-    war_dep = compute_war_dependence(base_schedule, write_access, read_access)
-    waw_dep = compute_waw_dependence(base_schedule, write_access)
-    all_deps = raw_dep.union(war_dep).union(waw_dep)
+    all_deps = compute_union_dependence(base_schedule, write_access, read_access)
 
     fused_schedule = _build_fused_schedule(
         tagged_funcs, ctx, param_space, max_loop_depth
@@ -262,9 +238,7 @@ def build_fused_ast(
         ast = build_ast_from_domain_and_schedule(domain, schedule)
     else:
         schedule = _compute_optimized_schedule(domain, all_deps)
-        context_set = isl.Set("{ : }", ctx)
-        build = isl.AstBuild.from_context(context_set)
-        ast = build.node_from_schedule(schedule)
+        ast = build_ast_from_schedule(schedule)
 
     parsed_ast = convert_ast_node(ast)
     _ensure_single_loop_nest(parsed_ast)
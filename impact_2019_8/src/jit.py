@@ -1,9 +1,129 @@
+"""生成したCコードをclangでコンパイルし、ctypes経由で呼び出す.
+
+コンパイル済みの共有ライブラリは、Cコード・コンパイルフラグ・clangの
+バージョンのハッシュをファイル名としてディスク上にキャッシュし、プロセスを
+またいで再利用する（同じコードの再コンパイルではclangを起動しない）。
+
+- 保存先は既定で `$XDG_CACHE_HOME/impact-2019-8/jit`
+  （未設定なら `~/.cache/impact-2019-8/jit`）。
+- 環境変数 `IMPACT_JIT_CACHE` に `0` / `off` / `false` / `no` を指定すると
+  キャッシュを使わず、一時ディレクトリでコンパイルしてロード後に削除する。
+  それ以外の値（`1` などの有効化の指定を除く）はキャッシュディレクトリの
+  パスとして使う。
+- キャッシュのエントリ数は `IMPACT_JIT_CACHE_SIZE`（既定256）までに保ち、
+  超えた分は最終使用時刻の古いものから削除する。
+"""
+
+import contextlib
 import ctypes
+import hashlib
 import os
+import re
 import subprocess
 import tempfile
+from functools import lru_cache
 from typing import Any
 
+# Cコードは標準入力から渡し、コンパイル段階間の中間ファイルも-pipeで
+# パイプに置き換える
+_CLANG_FLAGS: tuple[str, ...] = ("-shared", "-fPIC", "-O3", "-pipe")
+
+_CACHE_ENV = "IMPACT_JIT_CACHE"
+_CACHE_SIZE_ENV = "IMPACT_JIT_CACHE_SIZE"
+_DEFAULT_CACHE_SIZE = 256
+_CACHE_DISABLED = frozenset({"0", "off", "false", "no"})
+_CACHE_ENABLED = frozenset({"", "1", "on", "true", "yes"})
+
+# キャッシュのエントリ名（blake2bの16バイトダイジェスト）。退避の対象は
+# これに一致するファイルだけに限り、他のファイルには触れない
+_ENTRY_RE = re.compile(r"[0-9a-f]{32}\.(so|dylib)")
+
+
+def _cache_dir() -> str | None:
+    """コンパイル済みライブラリのキャッシュディレクトリ（無効ならNone）"""
+    setting = os.environ.get(_CACHE_ENV, "")
+    if setting.lower() in _CACHE_DISABLED:
+        return None
+    if setting.lower() not in _CACHE_ENABLED:
+        return setting
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "impact-2019-8", "jit")
+
+
+def _cache_size() -> int:
+    """キャッシュに残すエントリ数の上限"""
+    setting = os.environ.get(_CACHE_SIZE_ENV)
+    if setting is None:
+        return _DEFAULT_CACHE_SIZE
+    try:
+        size = int(setting)
+    except ValueError:
+        raise ValueError(
+            f"{_CACHE_SIZE_ENV} must be a positive integer, got {setting!r}"
+        ) from None
+    if size < 1:
+        raise ValueError(f"{_CACHE_SIZE_ENV} must be a positive integer, got {size}")
+    return size
+
+
+@lru_cache(maxsize=1)
+def _clang_version() -> str:
+    """キャッシュキーに含めるclangのバージョン文字列"""
+    result = subprocess.run(
+        ["clang", "--version"], capture_output=True, text=True, check=True
+    )
+    return result.stdout
+
+
+def _cache_key(c_code: str) -> str:
+    """Cコード・コンパイルフラグ・clangのバージョンからキーを作る
+
+    ツールチェーンやフラグが変わった場合に古いライブラリを読み込まないよう、
+    ソース以外の入力もハッシュに含める。
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in (_clang_version(), *_CLANG_FLAGS, c_code):
+        hasher.update(part.encode())
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def _run_clang(c_code: str, out_path: str):
+    """Cコードをout_pathの共有ライブラリにコンパイルする"""
+    try:
+        subprocess.run(
+            ["clang", *_CLANG_FLAGS, "-o", out_path, "-x", "c", "-"],
+            input=c_code,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Compilation failed: {e.stderr}") from e
+
+
+def _evict(cache_dir: str, max_entries: int):
+    """最終使用時刻（mtime）の古いエントリから削除し、上限数に収める"""
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if not _ENTRY_RE.fullmatch(entry.name):
+                continue
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+    excess = len(entries) - max_entries
+    if excess <= 0:
+        return
+    entries.sort()
+    for _, path in entries[:excess]:
+        # 並行する別プロセスが先に削除していてもよい
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+
 
 class JITCompiler:
     """CコードをJITコンパイルして実行するクラス"""
@@ -14,45 +134,62 @@ class JITCompiler:
         self._c_code = None
 
     def compile(self, c_code: str):
-        """Cコードをclangでコンパイルして共有ライブラリを作成する"""
-        self._c_code = c_code
+        """Cコードをclangでコンパイルして共有ライブラリを作成する
 
-        # 一時ディレクトリを作成
-        self._tmpdir = tempfile.mkdtemp()
-        c_file = os.path.join(self._tmpdir, "code.c")
+        キャッシュが有効なら、同じコードの再コンパイルではclangを起動せずに
+        キャッシュ済みのライブラリをロードだけ行う。
+        """
+        self._c_code = c_code
 
         # プラットフォームに応じた共有ライブラリの拡張子
         lib_ext = ".dylib" if os.uname().sysname == "Darwin" else ".so"
 
-        self._lib_path = os.path.join(self._tmpdir, f"code{lib_ext}")
-
-        # Cコードを一時ファイルに書き込む
-        with open(c_file, "w") as f:
-            f.write(c_code)
+        cache_dir = _cache_dir()
+        if cache_dir is None:
+            self._lib_path = None
+            self._lib = self._load_uncached(c_code, lib_ext)
+            return
 
+        self._lib_path = os.path.join(cache_dir, _cache_key(c_code) + lib_ext)
         try:
-            # clangで共有ライブラリをコンパイル
-            subprocess.run(
-                [
-                    "clang",
-                    "-shared",
-                    "-fPIC",
-                    "-O3",
-                    "-o",
-                    self._lib_path,
-                    c_file,
-                ],
-                capture_output=True,
-                text=True,
-                check=True,
-            )
-        except subprocess.CalledProcessError as e:
-            self._cleanup()
-            raise RuntimeError(f"Compilation failed: {e.stderr}") from e
+            # ヒットしたエントリは最終使用時刻を更新し、退避されにくくする
+            os.utime(self._lib_path)
+        except FileNotFoundError:
+            self._build(c_code, cache_dir, lib_ext)
+            _evict(cache_dir, _cache_size())
 
         # 共有ライブラリをロード
         self._lib = ctypes.CDLL(self._lib_path)
 
+    def _build(self, c_code: str, cache_dir: str, lib_ext: str):
+        """一時ファイルにコンパイルし、キャッシュのパスへアトミックに配置する"""
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=lib_ext, dir=cache_dir)
+        os.close(fd)
+
+        try:
+            _run_clang(c_code, tmp_path)
+            # 並行して同じコードをコンパイルしていても、置き換えは原子的なので
+            # ロード側が書きかけのライブラリを見ることはない
+            os.replace(tmp_path, self._lib_path)
+        finally:
+            # 失敗時は書きかけの一時ファイルを残さない
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _load_uncached(self, c_code: str, lib_ext: str) -> ctypes.CDLL:
+        """キャッシュを使わずにコンパイルし、ロード後にファイルを削除する"""
+        tmpdir = tempfile.mkdtemp()
+        lib_path = os.path.join(tmpdir, f"code{lib_ext}")
+        try:
+            _run_clang(c_code, lib_path)
+            # ロード済みのライブラリはファイルを削除しても使い続けられる
+            return ctypes.CDLL(lib_path)
+        finally:
+            if os.path.exists(lib_path):
+                os.unlink(lib_path)
+            os.rmdir(tmpdir)
+
     def get_function(
         self,
         func_name: str,
@@ -85,17 +222,3 @@ class JITCompiler:
         if args is None:
             args = []
         return func(*args)
-
-    def _cleanup(self):
-        """一時ファイルを削除する"""
-        if self._lib_path and os.path.exists(self._lib_path):
-            os.unlink(self._lib_path)
-        if hasattr(self, "_tmpdir") and os.path.exists(self._tmpdir):
-            c_file = os.path.join(self._tmpdir, "code.c")
-            if os.path.exists(c_file):
-                os.unlink(c_file)
-            os.rmdir(self._tmpdir)
-
-    def __del__(self):
-        """デストラクタで一時ファイルをクリーンアップ"""
-        self._cleanup()
@@ -3,13 +3,11 @@ from __future__ import annotations
 import islpy as isl
 
 from ir_to_isl import (
+    build_access_maps,
     build_domain,
-    build_read_access,
     build_schedule,
-    build_write_access,
-    compute_raw_dependence,
-    compute_war_dependence,
-    compute_waw_dependence,
+    compute_union_dependence,
+    default_context,
 )
 from ir_types import PrimFunc
 from optimization_types import IllegalTilingError, Tile
@@ -34,7 +32,7 @@ def check_tiling_legality(
     Returns:
         (is_legal, violations): 合法かどうかと、違反している依存関係のリスト
     """
-    ctx = ctx or isl.Context()
+    ctx = ctx or default_context()
 
     # スケジュールの軸数を取得
     n_axes = len(func.schedule.loop_order)
@@ -51,16 +49,10 @@ def check_tiling_legality(
     # スケジュールとアクセスを構築
     domain = build_domain(func, ctx)
     schedule_map = build_schedule(func, ctx).intersect_domain(domain)
-    read_access = build_read_access(func, ctx)
-    write_access = build_write_access(func, ctx)
+    write_access, read_access = build_access_maps(func, ctx)
 
-    # すべての依存関係を計算
-    raw_dep = compute_raw_dependence(schedule_map, write_access, read_access)
-    war_dep = compute_war_dependence(schedule_map, write_access, read_access)
-    waw_dep = compute_waw_dependence(schedule_map, write_access)
-
-    # すべての依存関係を結合
-    all_deps = raw_dep.union(war_dep).union(waw_dep)
+    # すべての依存関係を計算して結合
+    all_deps = compute_union_dependence(schedule_map, write_access, read_access)
 
     if all_deps.is_empty():
         return True, []
@@ -143,7 +135,7 @@ def apply_tiling(
     Raises:
         IllegalTilingError: タイル化が依存関係を違反する場合
     """
-    ctx = ctx or isl.Context()
+    ctx = ctx or default_context()
 
     # 合法性チェック
     if check_legality:
@@ -220,20 +212,15 @@ def compute_optimized_schedule(
     依存関係を解析し、Skewing等を含む最適なスケジュールを自動計算する。
     これにより、タイル化可能なPermutable Bandが生成される。
     """
-    ctx = ctx or isl.Context()
+    ctx = ctx or default_context()
 
     domain = build_domain(func, ctx)
     schedule_map = build_schedule(func, ctx).intersect_domain(domain)
-    read_access = build_read_access(func, ctx)
-    write_access = build_write_access(func, ctx)
+    write_access, read_access = build_access_maps(func, ctx)
 
-    raw_dep = compute_raw_dependence(schedule_map, write_access, read_access)
-    war_dep = compute_war_dependence(schedule_map, write_access, read_access)
-    waw_dep = compute_waw_dependence(schedule_map, write_access)
+    all_deps = compute_union_dependence(schedule_map, write_access, read_access)
 
     sc = isl.ScheduleConstraints.on_domain(domain)
-
-    all_deps = raw_dep.union(war_dep).union(waw_dep)
     sc = sc.set_validity(all_deps)
     sc = sc.set_coincidence(all_deps)
     sc = sc.set_proximity(all_deps)
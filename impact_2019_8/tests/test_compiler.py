@@ -2,6 +2,7 @@
 
 import pytest
 
+import compiler
 from compiler import compile
 from ir_types import (
     Access,
@@ -685,8 +686,8 @@ void gemm_tiled(int *A, int *B, int *C) {
             for (int c2 = 0; c2 <= 4095; c2++) {
                 for (int c3 = 0; c3 <= 31; c3++) {
                     for (int c4 = 0; c4 <= 63; c4++) {
-                        if (c2 == 0) C[(((c0 + c3))*2048 + ((c1 + c4)))] = 0;
-                        C[(((c0 + c3))*2048 + ((c1 + c4)))] += A[(((c0 + c3))*4096 + c2)] * B[(c2*2048 + ((c1 + c4)))];
+                        if (c2 == 0) C[((c0 + c3)*2048 + (c1 + c4))] = 0;
+                        C[((c0 + c3)*2048 + (c1 + c4))] += A[((c0 + c3)*4096 + c2)] * B[(c2*2048 + (c1 + c4))];
                     }
                 }
             }
@@ -743,7 +744,7 @@ void skewed(int *A) {
         for (int c1 = max(0, (c0 - 6)); c1 <= min(7, (c0 + 1)); c1 += 2) {
             for (int c2 = max(0, ((-c0) + 1)); c2 <= 1; c2++) {
                 for (int c3 = max(max(0, ((-c1) + 1)), (((c0 - c1) + c2) - 6)); c3 <= min(1, ((c0 - c1) + c2)); c3++) {
-                    A[(((c1 + c3))*8 + ((((c0 - c1) + c2) - c3)))] = A[(((c1 + c3) - 1)*8 + ((((c0 - c1) + c2) - c3) + 1))];
+                    A[((c1 + c3)*8 + (((c0 - c1) + c2) - c3))] = A[(((c1 + c3) - 1)*8 + ((((c0 - c1) + c2) - c3) + 1))];
                 }
             }
         }
@@ -751,3 +752,132 @@ void skewed(int *A) {
 }"""
 
     assert c_code == expected
+
+
+def _make_copy_func(name: str, src: Tensor, dst: Tensor, n: int) -> PrimFunc:
+    """dst[i, j] = src[i, j] のPrimFuncを毎回新しく組み立てる."""
+    return PrimFunc(
+        name=name,
+        params=(src, dst),
+        computes=(
+            Compute(
+                name="S",
+                domain=Domain(
+                    params=(),
+                    iterators=(Iterator("i"), Iterator("j")),
+                    constraints=(
+                        Compare(lhs=IntConst(0), op="LE", rhs=Var("i")),
+                        Compare(lhs=Var("i"), op="LT", rhs=IntConst(n)),
+                        Compare(lhs=IntConst(0), op="LE", rhs=Var("j")),
+                        Compare(lhs=Var("j"), op="LT", rhs=IntConst(n)),
+                    ),
+                ),
+                body=Store(
+                    access=Access(tensor=dst, index=(Var("i"), Var("j"))),
+                    value=Load(access=Access(tensor=src, index=(Var("i"), Var("j")))),
+                ),
+            ),
+        ),
+        schedule=Schedule(("i", "j")),
+    )
+
+
+def _tensors(n: int) -> tuple[Tensor, Tensor, Tensor]:
+    return (
+        Tensor("A", (IntConst(n), IntConst(n))),
+        Tensor("B", (IntConst(n), IntConst(n))),
+        Tensor("C", (IntConst(n), IntConst(n))),
+    )
+
+
+def test_compile_memoizes_structurally_equal_primfuncs():
+    """構造が等しいPrimFuncの再コンパイルはキャッシュから同じCコードを返す."""
+    compiler._compile_plain.cache_clear()
+    compiler._compile_fused.cache_clear()
+
+    def build() -> tuple[PrimFunc, PrimFunc]:
+        a, b, c = _tensors(8)
+        return _make_copy_func("f", a, b, 8), _make_copy_func("g", b, c, 8)
+
+    f1, g1 = build()
+    f2, g2 = build()
+    assert f1 is not f2
+
+    assert compile(f1) == compile(f2)
+    info = compiler._compile_plain.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+    assert compile([f1, g1]) == compile([f2, g2])
+    info = compiler._compile_fused.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_compile_cache_separates_optimize_and_tiles():
+    """最適化の有無・タイル幅の違いは別々のキャッシュエントリになる."""
+    compiler._compile_plain.cache_clear()
+    compiler._compile_optimized.cache_clear()
+
+    a, b, _ = _tensors(8)
+    func = _make_copy_func("copy", a, b, 8)
+
+    plain = compile(func)
+    optimized = compile(func, optimize=True)
+    tiled2 = compile(func, optimize=True, tiles=[Tile(0, 2)])
+    tiled4 = compile(func, optimize=True, tiles=[Tile(0, 4)])
+
+    assert "c0 += 2" in tiled2
+    assert "c0 += 4" in tiled4
+    assert tiled2 != tiled4
+    assert tiled2 not in (plain, optimized)
+
+    assert compiler._compile_plain.cache_info().currsize == 1
+    info = compiler._compile_optimized.cache_info()
+    assert (info.hits, info.misses) == (0, 3)
+
+
+def test_compile_deep_constraint():
+    """再帰上限を超える深さの制約式を含むPrimFuncもコンパイル・キャッシュできる."""
+    depth = 3000
+    a = Tensor("A", (IntConst(4), IntConst(4)))
+    b = Tensor("B", (IntConst(4), IntConst(4)))
+
+    def build() -> PrimFunc:
+        # i + j + j + ... + j (jが3000個) < 3000
+        lhs: BinaryOp | Var = Var("i")
+        for _ in range(depth):
+            lhs = BinaryOp(op="Add", lhs=lhs, rhs=Var("j"))
+        func = _make_copy_func("deep", a, b, 4)
+        domain = func.computes[0].domain
+        compute = Compute(
+            name="S",
+            domain=Domain(
+                params=domain.params,
+                iterators=domain.iterators,
+                constraints=(
+                    *domain.constraints,
+                    Compare(lhs=lhs, op="LT", rhs=IntConst(depth)),
+                ),
+            ),
+            body=func.computes[0].body,
+        )
+        return PrimFunc(
+            name=func.name,
+            params=func.params,
+            computes=(compute,),
+            schedule=func.schedule,
+        )
+
+    compiler._compile_plain.cache_clear()
+    c_code = compile(build())
+    assert compile(build()) == c_code
+    assert compiler._compile_plain.cache_info().hits == 1
+
+    # j は 0 に固定されるため、jのループは消える
+    expected = """\
+void deep(int *A, int *B) {
+    for (int c0 = 0; c0 <= 3; c0++) {
+        B[(c0*4 + 0)] = A[(c0*4 + 0)];
+    }
+}"""
+
+    assert c_code == expected
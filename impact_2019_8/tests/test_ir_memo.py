@@ -0,0 +1,58 @@
+"""ir_memoモジュールのテスト."""
+
+from ir_memo import identity_cache, structural_cache, structural_key
+from ir_types import BinaryOp, FloatConst, IntConst, Var
+
+
+def _deep_chain(depth: int) -> BinaryOp:
+    expr: BinaryOp | Var = Var("i")
+    for _ in range(depth):
+        expr = BinaryOp(op="Add", lhs=expr, rhs=IntConst(1))
+    assert isinstance(expr, BinaryOp)
+    return expr
+
+
+def test_identity_cache_keys_on_node_identity():
+    """同じノードはキャッシュに当たり、構造が等しい別ノードは別エントリになる."""
+    calls: list[object] = []
+
+    @identity_cache(maxsize=2)
+    def convert(expr: object) -> int:
+        calls.append(expr)
+        return len(calls)
+
+    deep = _deep_chain(3000)
+    assert convert(deep) == convert(deep) == 1
+    assert convert(_deep_chain(3000)) == 2
+
+    info = convert.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+
+    # maxsizeを超えると最も古いエントリから捨てる
+    convert(Var("j"))
+    assert convert.cache_info().currsize == 2
+    assert convert(deep) == 4
+
+
+def test_structural_key_matches_structure():
+    """構造が等しいときだけキーが等しく、深い木でも再帰上限に達しない."""
+    assert structural_key(_deep_chain(3000)) == structural_key(_deep_chain(3000))
+    assert structural_key(_deep_chain(3000)) != structural_key(_deep_chain(2999))
+
+    # 型の違い (IntConst と FloatConst、1 と 1.0) は区別する
+    assert structural_key(IntConst(1)) != structural_key(FloatConst(1.0))
+    assert structural_key((IntConst(1),)) != structural_key(IntConst(1))
+
+
+def test_structural_cache_hits_equal_objects():
+    """構造が等しい別オブジェクトは同じエントリに当たる."""
+
+    @structural_cache(maxsize=4)
+    def render(expr: object, tag: str) -> str:
+        return f"{tag}:{id(expr)}"
+
+    first = render(_deep_chain(100), "a")
+    assert render(_deep_chain(100), "a") == first
+    assert render(_deep_chain(100), "b") != first
+    info = render.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
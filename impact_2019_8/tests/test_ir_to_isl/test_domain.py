@@ -95,3 +95,27 @@ def test_build_domain_with_constraint_sum():
         "[N] -> { S[i, j] : 0 <= i < N and 0 <= j < N and i + j < N }", ctx
     )
     assert domain.is_equal(expected)
+
+
+def test_build_domain_deep_constraint():
+    """再帰上限を超える深さの制約式でもドメインを構築できる."""
+    ctx = isl.Context()
+    depth = 3000
+    lhs: BinaryOp | Var = Var("i")
+    for _ in range(depth):
+        lhs = BinaryOp(op="Add", lhs=lhs, rhs=Var("j"))
+    func = make_simple_func(
+        iterators=(Iterator(name="i"), Iterator(name="j")),
+        params=("N",),
+        constraints=(
+            Compare(lhs=IntConst(0), op="LE", rhs=Var("i")),
+            Compare(lhs=IntConst(0), op="LE", rhs=Var("j")),
+            Compare(lhs=lhs, op="LT", rhs=Var("N")),
+        ),
+    )
+    domain = build_domain(func, ctx)
+
+    expected = isl.UnionSet(
+        f"[N] -> {{ S[i, j] : 0 <= i and 0 <= j and i + {depth}j < N }}", ctx
+    )
+    assert domain.is_equal(expected)
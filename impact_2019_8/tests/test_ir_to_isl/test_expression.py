@@ -1,7 +1,7 @@
 """式変換のテスト."""
 
 from ir_to_isl import constraint_to_isl, expr_to_isl
-from ir_types import BinaryOp, Compare, IntConst, Var
+from ir_types import BinaryOp, Compare, IntConst, Logical, Var
 
 
 def test_expr_to_isl():
@@ -50,3 +50,54 @@ def test_constraint_to_isl():
         rhs=Var("j"),
     )
     assert constraint_to_isl(constraint) == "(2 * i) >= j"
+
+    # 0 <= i and (i < N and j < N): 同じ論理演算の連鎖は平坦化する
+    constraint = Logical(
+        op="And",
+        lhs=Compare(lhs=IntConst(0), op="LE", rhs=Var("i")),
+        rhs=Logical(
+            op="And",
+            lhs=Compare(lhs=Var("i"), op="LT", rhs=Var("N")),
+            rhs=Compare(lhs=Var("j"), op="LT", rhs=Var("N")),
+        ),
+    )
+    assert constraint_to_isl(constraint) == "(0 <= i and i < N and j < N)"
+
+
+def test_expr_to_isl_constant_folding():
+    """定数同士の演算と自明な演算の畳み込みテスト."""
+    # floor(7 / 2) -> 3
+    expr = BinaryOp(op="Div", lhs=IntConst(7), rhs=IntConst(2))
+    assert expr_to_isl(expr) == "3"
+
+    # max(5, (3 * 4)) -> 12 (入れ子も畳み込む)
+    expr = BinaryOp(
+        op="Max",
+        lhs=IntConst(5),
+        rhs=BinaryOp(op="Mul", lhs=IntConst(3), rhs=IntConst(4)),
+    )
+    assert expr_to_isl(expr) == "12"
+
+    # (i + 0) * 1 -> i
+    expr = BinaryOp(
+        op="Mul",
+        lhs=BinaryOp(op="Add", lhs=Var("i"), rhs=IntConst(0)),
+        rhs=IntConst(1),
+    )
+    assert expr_to_isl(expr) == "i"
+
+    # 除数が正でない場合はISLに任せる
+    expr = BinaryOp(op="Mod", lhs=IntConst(7), rhs=IntConst(-2))
+    assert expr_to_isl(expr) == "(7 % -2)"
+
+
+def test_expr_to_isl_deep_tree():
+    """再帰上限を超える深さの式も変換できるテスト."""
+    depth = 3000
+    expr = Var("i")
+    for _ in range(depth):
+        expr = BinaryOp(op="Add", lhs=expr, rhs=Var("j"))
+    assert expr_to_isl(expr) == "(" * depth + "i" + " + j)" * depth
+
+    constraint = Compare(lhs=expr, op="LE", rhs=Var("N"))
+    assert constraint_to_isl(constraint).endswith(" + j) <= N")
@@ -2,7 +2,7 @@
 
 import islpy as isl
 
-from isl_ast import build_ast_from_domain_and_schedule
+from isl_ast import build_ast_from_domain_and_schedule, build_ast_from_schedule
 
 
 def test_build_ast_from_domain_and_schedule():
@@ -21,3 +21,23 @@ def test_build_ast_from_domain_and_schedule():
     )
 
     assert isl_str == expected
+
+
+def test_build_ast_from_schedule():
+    """スケジュールツリーからASTを生成できる."""
+    ctx = isl.Context()
+    domain = isl.UnionSet("{ S[i] : 0 <= i < 10 }", ctx)
+    schedule = isl.Schedule.from_domain(domain)
+    partial = isl.MultiUnionPwAff("[{ S[i] -> [(i)] }]", ctx)
+    schedule = schedule.get_root().child(0).insert_partial_schedule(partial)
+
+    ast = build_ast_from_schedule(schedule.get_schedule())
+    isl_str = str(ast)
+
+    expected = (
+        "{ iterator: { id: c0 }, init: { val: 0 }, cond: { op: le, args: "
+        "[ { id: c0 }, { val: 9 } ] }, inc: { val: 1 }, body: { user: "
+        "{ op: call, args: [ { id: S }, { id: c0 } ] } } }"
+    )
+
+    assert isl_str == expected
@@ -1,8 +1,11 @@
 """isl_ast_to_cモジュールのテスト."""
 
 import islpy as isl
+import pytest
 
+from ast_types import BinOp, Id, Val
 from codegen import isl_ast_to_c
+from codegen.expr import generate_expr
 from ir_types import (
     Access,
     BinaryOp,
@@ -72,3 +75,41 @@ void kernel(int *A, int *B, int *C) {
 }"""
 
     assert c_code == expected
+
+
+def test_generate_expr_rejects_unsupported_operator():
+    """C言語に対応する演算子がない場合はエラーになることをテストする."""
+    expr = BinOp(op="fdiv_q", left=Id("c0"), right=Val(2))
+
+    with pytest.raises(ValueError, match="Unsupported operator: fdiv_q"):
+        generate_expr(expr)
+
+
+def test_convert_multi_arg_min_to_balanced_tree():
+    """多引数のminは深さO(log n)の二項演算の木に変換される."""
+    ctx = isl.Context()
+    domain = isl.UnionSet(
+        "[A, B, C, D] -> { S[i] : 0 <= i <= A and i <= B and i <= C and i <= D }",
+        ctx,
+    )
+    schedule = isl.UnionMap("{ S[i] -> [i] }", ctx).intersect_domain(domain)
+    loop = convert_ast_node(isl.AstBuild.alloc(ctx).node_from_schedule_map(schedule))
+
+    assert loop.cond.right == BinOp(
+        op="min",
+        left=BinOp(op="min", left=Id(name="A"), right=Id(name="B")),
+        right=BinOp(op="min", left=Id(name="C"), right=Id(name="D")),
+    )
+
+
+def test_generate_expr_caches_only_top_level_node():
+    """キャッシュはトップレベルのノード単位で、部分木はエントリにならない."""
+    generate_expr.cache_clear()
+    inner = BinOp(op="mul", left=Id("c0"), right=Val(4))
+    expr = BinOp(op="add", left=inner, right=Id("c1"))
+
+    assert generate_expr(expr) == "((c0 * 4) + c1)"
+    assert generate_expr(expr) == "((c0 * 4) + c1)"
+
+    info = generate_expr.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
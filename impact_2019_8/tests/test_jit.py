@@ -0,0 +1,151 @@
+"""JITコンパイルのキャッシュのテスト."""
+
+import os
+import subprocess
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+import jit
+from jit import JITCompiler
+
+C_CODE = "int f(void) { return 42; }"
+
+
+class FakeClang:
+    """subprocess.runの代わりに呼び出しを記録し、出力ファイルを書く."""
+
+    def __init__(self) -> None:
+        self.version = "clang version 1.0.0\n"
+        self.fail = False
+        self.builds: list[list[str]] = []
+
+    def __call__(
+        self, args: list[str], **kwargs: object
+    ) -> subprocess.CompletedProcess:
+        if args[1:] == ["--version"]:
+            return subprocess.CompletedProcess(args, 0, stdout=self.version)
+        self.builds.append(args)
+        if self.fail:
+            raise subprocess.CalledProcessError(1, args, stderr="syntax error")
+        Path(args[args.index("-o") + 1]).write_bytes(b"fake library")
+        return subprocess.CompletedProcess(args, 0)
+
+
+@pytest.fixture
+def fake_clang(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[FakeClang]:
+    clang = FakeClang()
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.delenv("IMPACT_JIT_CACHE", raising=False)
+    monkeypatch.delenv("IMPACT_JIT_CACHE_SIZE", raising=False)
+    monkeypatch.setattr(jit.subprocess, "run", clang)
+    monkeypatch.setattr(jit.ctypes, "CDLL", lambda path: path)
+    jit._clang_version.cache_clear()
+    yield clang
+    jit._clang_version.cache_clear()
+
+
+def _cached_libs(tmp_path: Path) -> list[Path]:
+    cache_dir = tmp_path / "impact-2019-8" / "jit"
+    return sorted(cache_dir.iterdir()) if cache_dir.exists() else []
+
+
+def test_compile_reuses_cached_library(fake_clang: FakeClang, tmp_path: Path) -> None:
+    # 1回目はclangでビルドし、2回目は別インスタンスでもキャッシュから読み込む
+    first = JITCompiler()
+    first.compile(C_CODE)
+    second = JITCompiler()
+    second.compile(C_CODE)
+
+    assert len(fake_clang.builds) == 1
+    libs = _cached_libs(tmp_path)
+    assert len(libs) == 1
+    assert first._lib == second._lib == str(libs[0])
+
+
+def test_compile_key_depends_on_code_and_toolchain(
+    fake_clang: FakeClang, tmp_path: Path
+) -> None:
+    JITCompiler().compile(C_CODE)
+    JITCompiler().compile("int g(void) { return 0; }")
+    assert len(fake_clang.builds) == 2
+
+    # clangのバージョンが変われば同じコードでも再ビルドする
+    fake_clang.version = "clang version 2.0.0\n"
+    jit._clang_version.cache_clear()
+    JITCompiler().compile(C_CODE)
+
+    assert len(fake_clang.builds) == 3
+    assert len(_cached_libs(tmp_path)) == 3
+
+
+def test_compile_failure_leaves_no_cache_entry(
+    fake_clang: FakeClang, tmp_path: Path
+) -> None:
+    fake_clang.fail = True
+    with pytest.raises(RuntimeError, match="syntax error"):
+        JITCompiler().compile(C_CODE)
+    assert _cached_libs(tmp_path) == []
+
+    # 失敗した結果はキャッシュされず、次の呼び出しで再ビルドする
+    fake_clang.fail = False
+    JITCompiler().compile(C_CODE)
+    assert len(fake_clang.builds) == 2
+    assert len(_cached_libs(tmp_path)) == 1
+
+
+def test_compile_with_cache_disabled(
+    fake_clang: FakeClang, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    # キャッシュを無効にすると毎回ビルドし、ロード後はファイルを残さない
+    monkeypatch.setenv("IMPACT_JIT_CACHE", "0")
+    for _ in range(2):
+        compiler = JITCompiler()
+        compiler.compile(C_CODE)
+        assert not Path(compiler._lib).exists()
+
+    assert len(fake_clang.builds) == 2
+    assert _cached_libs(tmp_path) == []
+
+
+def test_compile_with_redirected_cache(
+    fake_clang: FakeClang, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    custom = tmp_path / "custom"
+    monkeypatch.setenv("IMPACT_JIT_CACHE", str(custom))
+    compiler = JITCompiler()
+    compiler.compile(C_CODE)
+
+    assert Path(compiler._lib).parent == custom
+    assert _cached_libs(tmp_path) == []
+
+
+def test_compile_evicts_least_recently_used(
+    fake_clang: FakeClang, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setenv("IMPACT_JIT_CACHE_SIZE", "2")
+    codes = [f"int f{n}(void) {{ return {n}; }}" for n in range(3)]
+
+    paths = []
+    for code in codes[:2]:
+        compiler = JITCompiler()
+        compiler.compile(code)
+        paths.append(Path(compiler._lib))
+    # 最終使用時刻を固定し、1つ目を使い直すと2つ目が最も古くなる
+    os.utime(paths[0], (1000, 1000))
+    os.utime(paths[1], (2000, 2000))
+    JITCompiler().compile(codes[0])
+
+    # キャッシュのエントリ以外のファイルは退避の対象にしない
+    unrelated = paths[0].parent / "notes.so"
+    unrelated.write_bytes(b"")
+
+    compiler = JITCompiler()
+    compiler.compile(codes[2])
+
+    assert paths[0].exists()
+    assert not paths[1].exists()
+    assert Path(compiler._lib).exists()
+    assert unrelated.exists()
+    assert len(fake_clang.builds) == 3
@@ -1,8 +1,9 @@
 """reductionコード生成のテスト."""
 
 import islpy as isl
+import pytest
 
-from codegen import isl_ast_to_c
+from codegen import CCodeGenerator, isl_ast_to_c
 from ir_types import (
     Access,
     BinaryOp,
@@ -90,3 +91,216 @@ void gemm(int *A, int *B, int *C) {
 }"""
 
     assert c_code == expected
+
+
+def test_codegen_reduction_init_uses_domain_lower_bound() -> None:
+    # reduce軸 k が 1 から始まる場合、初期化条件も k == 1 になる
+    ctx = isl.Context()
+    domain = isl.UnionSet("{ S[i, k] : 0 <= i <= 1 and 1 <= k <= 3 }")
+    schedule = isl.UnionMap("{ S[i, k] -> [i, k] }").intersect_domain(domain)
+    isl_ast = isl.AstBuild.alloc(ctx).node_from_schedule_map(schedule)
+
+    a = Tensor("A", (IntConst(2), IntConst(4)))
+    out = Tensor("O", (IntConst(2),))
+    compute = Compute(
+        name="S",
+        domain=Domain(
+            params=(),
+            iterators=(Iterator("i"), Iterator("k", kind="reduce")),
+            constraints=(
+                Compare(lhs=IntConst(0), op="LE", rhs=Var("i")),
+                Compare(lhs=Var("i"), op="LT", rhs=IntConst(2)),
+                Compare(lhs=IntConst(0), op="LT", rhs=Var("k")),
+                Compare(lhs=Var("k"), op="LT", rhs=IntConst(4)),
+            ),
+        ),
+        body=ReduceStore(
+            op="Max",
+            access=Access(tensor=out, index=(Var("i"),)),
+            value=Load(access=Access(tensor=a, index=(Var("i"), Var("k")))),
+            init=Load(access=Access(tensor=a, index=(Var("i"), IntConst(0)))),
+        ),
+    )
+    func = PrimFunc(
+        name="row_max",
+        computes=(compute,),
+        schedule=Schedule(("i", "k")),
+        params=(a, out),
+    )
+
+    c_code = isl_ast_to_c(convert_ast_node(isl_ast), func)
+
+    expected = """\
+void row_max(int *A, int *O) {
+    for (int c0 = 0; c0 <= 1; c0++) {
+        for (int c1 = 1; c1 <= 3; c1++) {
+            if (c1 == 1) O[c0] = A[c0*4];
+            O[c0] = (O[c0] > A[(c0*4 + c1)]) ? O[c0] : A[(c0*4 + c1)];
+        }
+    }
+}"""
+
+    assert c_code == expected
+
+
+def test_codegen_rejects_unsupported_reduce_op_on_construction() -> None:
+    # 未対応のreduce演算はAST走査前、ジェネレータ構築時点でエラーにする
+    out = Tensor("O", (IntConst(1),))
+    compute = Compute(
+        name="S",
+        domain=Domain(
+            params=(),
+            iterators=(Iterator("k", kind="reduce"),),
+            constraints=(
+                Compare(lhs=IntConst(0), op="LE", rhs=Var("k")),
+                Compare(lhs=Var("k"), op="LT", rhs=IntConst(4)),
+            ),
+        ),
+        body=ReduceStore(
+            op="Avg",  # type: ignore[arg-type]
+            access=Access(tensor=out, index=(IntConst(0),)),
+            value=IntConst(1),
+        ),
+    )
+    func = PrimFunc(
+        name="bad_reduce",
+        computes=(compute,),
+        schedule=Schedule(("k",)),
+        params=(out,),
+    )
+
+    with pytest.raises(ValueError, match="Unsupported reduce op"):
+        CCodeGenerator(func)
+
+
+def test_codegen_scalar_reduction() -> None:
+    # rank-0 (スカラー) テンソルもポインタで渡されるので s[0] として参照する
+    ctx = isl.Context()
+    domain = isl.UnionSet("{ S[k] : 0 <= k <= 3 }")
+    schedule = isl.UnionMap("{ S[k] -> [k] }").intersect_domain(domain)
+    isl_ast = isl.AstBuild.alloc(ctx).node_from_schedule_map(schedule)
+
+    a = Tensor("A", (IntConst(4),))
+    s = Tensor("s", ())
+    compute = Compute(
+        name="S",
+        domain=Domain(
+            params=(),
+            iterators=(Iterator("k", kind="reduce"),),
+            constraints=(
+                Compare(lhs=IntConst(0), op="LE", rhs=Var("k")),
+                Compare(lhs=Var("k"), op="LT", rhs=IntConst(4)),
+            ),
+        ),
+        body=ReduceStore(
+            op="Sum",
+            access=Access(tensor=s, index=()),
+            value=Load(access=Access(tensor=a, index=(Var("k"),))),
+            init=IntConst(0),
+        ),
+    )
+    func = PrimFunc(
+        name="total",
+        computes=(compute,),
+        schedule=Schedule(("k",)),
+        params=(a, s),
+    )
+
+    c_code = isl_ast_to_c(convert_ast_node(isl_ast), func)
+
+    expected = """\
+void total(int *A, int *s) {
+    for (int c0 = 0; c0 <= 3; c0++) {
+        if (c0 == 0) s[0] = 0;
+        s[0] += A[c0];
+    }
+}"""
+
+    assert c_code == expected
+
+
+def _row_sum_func(
+    k_constraints: tuple[Compare, ...], params: tuple[str, ...] = ()
+) -> PrimFunc:
+    a = Tensor("A", (IntConst(2), IntConst(4)))
+    out = Tensor("O", (IntConst(2),))
+    compute = Compute(
+        name="S",
+        domain=Domain(
+            params=params,
+            iterators=(Iterator("i"), Iterator("k", kind="reduce")),
+            constraints=(
+                Compare(lhs=IntConst(0), op="LE", rhs=Var("i")),
+                Compare(lhs=Var("i"), op="LT", rhs=IntConst(2)),
+                Compare(lhs=Var("k"), op="LT", rhs=IntConst(4)),
+                *k_constraints,
+            ),
+        ),
+        body=ReduceStore(
+            op="Sum",
+            access=Access(tensor=out, index=(Var("i"),)),
+            value=Load(access=Access(tensor=a, index=(Var("i"), Var("k")))),
+            init=IntConst(0),
+        ),
+    )
+    return PrimFunc(
+        name="row_sum",
+        computes=(compute,),
+        schedule=Schedule(("i", "k")),
+        params=(a, out),
+    )
+
+
+def test_codegen_reduction_init_mixed_lower_bounds() -> None:
+    # 定数・パラメータ・外側のイテレータが混在する下限は max で組み合わせる
+    ctx = isl.Context()
+    domain = isl.UnionSet(
+        "[N] -> { S[i, k] : 0 <= i <= 1 and 0 <= k <= 3 and N <= k and i < k }", ctx
+    )
+    schedule = isl.UnionMap("{ S[i, k] -> [i, k] }", ctx).intersect_domain(domain)
+    isl_ast = isl.AstBuild.alloc(ctx).node_from_schedule_map(schedule)
+
+    func = _row_sum_func(
+        (
+            Compare(lhs=IntConst(0), op="LE", rhs=Var("k")),
+            Compare(lhs=Var("N"), op="LE", rhs=Var("k")),
+            Compare(lhs=Var("k"), op="GT", rhs=Var("i")),
+        ),
+        params=("N",),
+    )
+
+    c_code = isl_ast_to_c(convert_ast_node(isl_ast), func)
+
+    expected = """\
+void row_sum(int *A, int *O) {
+    for (int c0 = 0; c0 <= 1; c0++) {
+        for (int c1 = max(N, (c0 + 1)); c1 <= 3; c1++) {
+            if (c1 == max(max(0, N), c0 + 1)) O[c0] = 0;
+            O[c0] += A[(c0*4 + c1)];
+        }
+    }
+}"""
+
+    assert c_code == expected
+
+
+def test_codegen_reduction_rejects_underivable_lower_bound() -> None:
+    # 2*k >= 1 のように下限を読み取れない制約があれば、誤った初期化条件を
+    # 生成せずにエラーにする
+    func = _row_sum_func(
+        (
+            Compare(lhs=IntConst(0), op="LE", rhs=Var("k")),
+            Compare(
+                lhs=BinaryOp(op="Mul", lhs=IntConst(2), rhs=Var("k")),
+                op="GE",
+                rhs=IntConst(1),
+            ),
+        )
+    )
+
+    with pytest.raises(ValueError, match="lower bound of reduction iterator 'k'"):
+        CCodeGenerator(func)
+
+    # 下限の制約が1つもない場合もエラーにする
+    with pytest.raises(ValueError, match="no lower bound"):
+        CCodeGenerator(_row_sum_func(()))